@@ -0,0 +1,85 @@
+import time
+from typing import Callable, Dict, Optional, Tuple
+
+Address = Tuple[str, int]
+
+
+class AudioBufferManager:
+    """Accumulates UDP audio packets per client until a buffer is ready to process"""
+
+    def __init__(self, target_size: int, timeout_seconds: float, min_bytes: int,
+                 on_buffer: Callable[[bytes, Address], None],
+                 on_new_client: Optional[Callable[[Address], None]] = None,
+                 on_packet: Optional[Callable[[bytes, Address, float], None]] = None,
+                 on_discard: Optional[Callable[[Address], None]] = None):
+        self.target_size = target_size
+        self.timeout_seconds = timeout_seconds
+        self.min_bytes = min_bytes
+        self.on_buffer = on_buffer
+        self.on_new_client = on_new_client
+        # Streaming recognition hooks: every packet, and buffers dropped as too short
+        self.on_packet = on_packet
+        self.on_discard = on_discard
+        self.client_buffers: Dict[Address, Dict] = {}
+
+    def add_packet(self, data: bytes, addr: Address, now: Optional[float] = None):
+        """Append one datagram to the client's buffer, processing it once full"""
+        if now is None:
+            now = time.time()
+
+        client = self.client_buffers.get(addr)
+        if client is None:
+            client = {'buffer': bytearray(), 'last_packet_time': now}
+            self.client_buffers[addr] = client
+            if self.on_new_client:
+                self.on_new_client(addr)
+            print(f"[INFO] New client connected: {addr}. Creating buffer.")
+
+        client['buffer'] += data
+        client['last_packet_time'] = now
+        if self.on_packet:
+            self.on_packet(data, addr, now)
+
+        if len(client['buffer']) >= self.target_size:
+            print(f"[INFO] Client {addr} buffer reached target size. Processing...")
+            audio = bytes(client['buffer'])
+            client['buffer'] = bytearray()
+            self.on_buffer(audio, addr)
+
+    def flush_stale(self, now: Optional[float] = None):
+        """Process (or discard) buffers of clients that stopped sending"""
+        if now is None:
+            now = time.time()
+
+        for addr in list(self.client_buffers.keys()):
+            client = self.client_buffers[addr]
+            if now - client['last_packet_time'] > self.timeout_seconds:
+                del self.client_buffers[addr]
+                if len(client['buffer']) > self.min_bytes:
+                    print(f"[INFO] Client {addr} timed out. Processing collected audio...")
+                    self.on_buffer(bytes(client['buffer']), addr)
+                else:
+                    print(f"[INFO] Client {addr} timed out with insufficient audio. Discarding buffer.")
+                    if self.on_discard:
+                        self.on_discard(addr)
+
+
+def udp_audio_loop(sock, buffers: AudioBufferManager, recv_size: int = 2048, capture=None):
+    """
+    Receive loop shared by the in-process listener thread and the sharded
+    workers. `capture` is an optional udp_capture.CaptureWriter.
+    """
+    port = sock.getsockname()[1]
+    while True:
+        # Drain everything queued on the socket before sleeping again
+        try:
+            while True:
+                data, addr = sock.recvfrom(recv_size)
+                if capture:
+                    capture.record(port, addr, data)
+                buffers.add_packet(data, addr)
+        except BlockingIOError:
+            pass
+
+        buffers.flush_stale()
+        time.sleep(0.01)
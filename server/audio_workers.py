@@ -0,0 +1,101 @@
+import multiprocessing
+import socket
+import threading
+import time
+from typing import Callable, List, Optional
+
+
+def create_reuseport_socket(ip: str, port: int) -> socket.socket:
+    """Non-blocking UDP socket that can share its port with the other workers"""
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+    sock.bind((ip, port))
+    sock.setblocking(0)
+    return sock
+
+
+def _run_worker(worker_target: Callable, index: int, sock: socket.socket, events):
+    print(f"[WORKER {index}] Audio worker started (pid {multiprocessing.current_process().pid})")
+    worker_target(index, sock, events.put)
+
+
+class AudioWorkerPool:
+    """
+    Supervisor for sharded audio ingest.
+
+    Starts `num_workers` processes that each bind the audio port with
+    SO_REUSEPORT, so the kernel hashes every board's flow to a stable worker.
+    Workers only recognize audio; they report what they found through a
+    multiprocessing queue and this (API) process applies it, which keeps the
+    device state, DB writes and WebSocket broadcasts in a single writer.
+    """
+
+    MONITOR_INTERVAL_SECONDS = 1.0
+
+    def __init__(self, num_workers: int, ip: str, port: int,
+                 worker_target: Callable, event_handler: Callable):
+        if not hasattr(socket, "SO_REUSEPORT"):
+            raise RuntimeError("SO_REUSEPORT is not supported on this platform")
+
+        self.num_workers = num_workers
+        self.ip = ip
+        self.port = port
+        self.worker_target = worker_target
+        self.event_handler = event_handler
+
+        # Never fork the API process directly: it already runs threads (uvicorn,
+        # listeners, scheduler) and a child could inherit a lock one of them
+        # holds. Workers start from the clean forkserver (or a fresh
+        # interpreter), which re-imports the server module.
+        start_method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+        self._ctx = multiprocessing.get_context(start_method)
+        self.events = self._ctx.Queue()
+        self.workers: List[Optional[multiprocessing.Process]] = [None] * num_workers
+        self._stopped = threading.Event()
+
+    def start(self):
+        for index in range(self.num_workers):
+            self._start_worker(index)
+
+        threading.Thread(target=self._drain_events, daemon=True).start()
+        threading.Thread(target=self._monitor_workers, daemon=True).start()
+        print(f"[WORKERS] Started {self.num_workers} audio workers on port {self.port}")
+
+    def _start_worker(self, index: int):
+        # Bind in the parent so a bind error surfaces here, not in the child
+        sock = create_reuseport_socket(self.ip, self.port)
+        process = self._ctx.Process(
+            target=_run_worker,
+            args=(self.worker_target, index, sock, self.events),
+            name=f"audio-worker-{index}",
+            daemon=True,
+        )
+        process.start()
+        # The child owns the socket now; keeping it open here would leave a
+        # dead member in the reuseport group if the child exits.
+        sock.close()
+        self.workers[index] = process
+
+    def _drain_events(self):
+        while True:
+            event = self.events.get()
+            try:
+                self.event_handler(event)
+            except Exception as e:
+                print(f"[WORKERS] Error handling event {event[0]}: {e}")
+
+    def _monitor_workers(self):
+        while True:
+            time.sleep(self.MONITOR_INTERVAL_SECONDS)
+            if self._stopped.is_set():
+                return
+            for index, process in enumerate(self.workers):
+                if process is not None and not process.is_alive():
+                    print(f"[WORKERS] Worker {index} exited with code {process.exitcode}. Restarting...")
+                    self._start_worker(index)
+
+    def stop(self):
+        self._stopped.set()
+        for process in self.workers:
+            if process is not None and process.is_alive():
+                process.terminate()
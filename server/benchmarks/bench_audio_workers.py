@@ -0,0 +1,138 @@
+"""
+Measures how sharded audio ingest scales with the number of worker processes.
+
+Synthetic boards (one source port each) stream audio over loopback to an
+AudioWorkerPool. Google recognition is replaced by a fixed amount of CPU work
+per utterance, so the rate of completed utterances shows how much more load
+the pool absorbs as workers are added. Scaling stops at the number of cores.
+
+    cd server
+    python benchmarks/bench_audio_workers.py --workers 1,2,4 --boards 64 --speed 8
+"""
+import argparse
+import functools
+import hashlib
+import multiprocessing
+import os
+import socket
+import sys
+import threading
+import time
+from collections import Counter
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from audio_ingest import AudioBufferManager, udp_audio_loop  # noqa: E402
+from audio_workers import AudioWorkerPool  # noqa: E402
+
+# Mirrors the audio settings in main.py
+AUDIO_BYTES_PER_SECOND = 16000 * 2 * 1
+TARGET_BUFFER_SIZE = int(AUDIO_BYTES_PER_SECOND * 3.0)
+PACKET_SIZE = 1024
+
+
+def simulated_recognition(audio: bytes, rounds: int):
+    for _ in range(rounds):
+        hashlib.sha256(audio).digest()
+
+
+def calibrate(work_ms: float) -> int:
+    """Rounds of simulated_recognition that take about `work_ms` on one core"""
+    audio = os.urandom(TARGET_BUFFER_SIZE)
+    start = time.process_time()
+    simulated_recognition(audio, 50)
+    per_round = (time.process_time() - start) / 50
+    return max(1, round(work_ms / 1000 / per_round))
+
+
+def bench_worker(rounds: int, worker_index: int, sock, emit):
+    # The buffer manager logs every utterance; keep the output readable
+    sys.stdout = open(os.devnull, "w")
+
+    def on_buffer(audio, addr):
+        simulated_recognition(audio, rounds)
+        emit(("utterance", worker_index))
+
+    emit(("ready", worker_index))
+    buffers = AudioBufferManager(TARGET_BUFFER_SIZE, 1.0, AUDIO_BYTES_PER_SECOND // 2, on_buffer)
+    udp_audio_loop(sock, buffers)
+
+
+def send_audio(port: int, boards: int, speed: float, stop):
+    """Streams audio from `boards` sockets at `speed` times real time"""
+    sockets = [socket.socket(socket.AF_INET, socket.SOCK_DGRAM) for _ in range(boards)]
+    packet = os.urandom(PACKET_SIZE)
+    packets_per_second = AUDIO_BYTES_PER_SECOND * speed / PACKET_SIZE
+    start = time.perf_counter()
+    sent = 0
+
+    while not stop.is_set():
+        due = int((time.perf_counter() - start) * packets_per_second)
+        for _ in range(due - sent):
+            for sock in sockets:
+                sock.sendto(packet, ("127.0.0.1", port))
+        sent = max(sent, due)
+        time.sleep(0.005)
+
+
+def free_port() -> int:
+    with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def run(workers: int, boards: int, speed: float, rounds: int, seconds: float, warmup: float):
+    counts = Counter()
+    ready = threading.Semaphore(0)
+
+    def on_event(event):
+        if event[0] == "ready":
+            ready.release()
+        else:
+            counts[event[1]] += 1
+
+    port = free_port()
+    pool = AudioWorkerPool(workers, "127.0.0.1", port, functools.partial(bench_worker, rounds), on_event)
+    pool.start()
+    for _ in range(workers):
+        ready.acquire()
+
+    ctx = multiprocessing.get_context("spawn")
+    stop = ctx.Event()
+    sender = ctx.Process(target=send_audio, args=(port, boards, speed, stop), daemon=True)
+    sender.start()
+
+    time.sleep(warmup)
+    before = counts.copy()
+    time.sleep(seconds)
+    after = counts.copy()
+
+    stop.set()
+    sender.join()
+    pool.stop()
+
+    handled = after - before
+    return sum(handled.values()) / seconds, [handled[index] for index in range(workers)]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", default="1,2,4", help="comma-separated worker counts")
+    parser.add_argument("--boards", type=int, default=64)
+    parser.add_argument("--speed", type=float, default=8.0, help="audio rate per board, times real time")
+    parser.add_argument("--work-ms", type=float, default=20.0, help="simulated recognition CPU per utterance")
+    parser.add_argument("--seconds", type=float, default=5.0)
+    parser.add_argument("--warmup", type=float, default=2.0)
+    args = parser.parse_args()
+
+    rounds = calibrate(args.work_ms)
+    offered = args.boards * args.speed * AUDIO_BYTES_PER_SECOND / TARGET_BUFFER_SIZE
+    print(f"{os.cpu_count()} CPUs, {args.boards} boards at {args.speed}x, "
+          f"{args.work_ms:.0f} ms recognition work, {offered:.1f} utterances/s offered")
+
+    baseline = None
+    print(f"\n{'workers':>8}{'utterances/s':>15}{'speedup':>10}  per worker")
+    for workers in (int(count) for count in args.workers.split(",")):
+        rate, per_worker = run(workers, args.boards, args.speed, rounds, args.seconds, args.warmup)
+        baseline = baseline or rate
+        print(f"{workers:>8}{rate:>15.1f}{rate / baseline:>9.2f}x  {per_worker}")
@@ -0,0 +1,103 @@
+"""
+Compares the SQLite and columnar energy backends on a seeded data set.
+
+    cd server
+    python benchmarks/bench_energy_store.py --rows 1000000
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import Database  # noqa: E402
+
+COLORS = ["LED1_OFF", "LED1_RED", "LED1_GREEN", "LED1_BLUE", "LED1_WHITE", "LED2_ON", "LED2_OFF"]
+
+
+def generate_samples(rows: int, devices: int, hours: int, seed: int = 1):
+    rng = random.Random(seed)
+    now = time.time()
+    for _ in range(rows):
+        device = rng.randrange(devices)
+        yield (
+            now - rng.random() * hours * 3600,
+            f"esp32_10_0_{device // 256}_{device % 256}",
+            rng.choice([0.0, 0.066, 0.132, 0.198]),
+            rng.random() * 600,
+            rng.choice(COLORS),
+        )
+
+
+def seed_sqlite(db: Database, samples):
+    conn = db.get_connection()
+    conn.executemany(
+        "INSERT INTO energy_logs (timestamp, device_id, power_watts, duration_seconds, energy_wh, color) "
+        "VALUES (?, ?, ?, ?, ?, ?)",
+        (
+            (datetime.fromtimestamp(ts, tz=timezone.utc).strftime("%Y-%m-%d %H:%M:%S"),
+             device_id, power, duration, power * duration / 3600, color)
+            for ts, device_id, power, duration, color in samples
+        ),
+    )
+    conn.commit()
+    conn.close()
+
+
+def seed_columnar(db: Database, samples):
+    for ts, device_id, power, duration, color in sorted(samples):
+        db.energy_store.add_energy_log(device_id, power, duration, color, timestamp=ts)
+    db.energy_store.flush()
+
+
+def timed(fn, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def run(rows: int, devices: int, hours: int, repeat: int):
+    samples = list(generate_samples(rows, devices, hours))
+    device_id = samples[0][1]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        sqlite_db = Database(os.path.join(tmp, "sqlite.db"))
+        columnar_db = Database(os.path.join(tmp, "columnar.db"), energy_backend="columnar",
+                               energy_store_path=os.path.join(tmp, "energy_store"))
+
+        start = time.perf_counter()
+        seed_sqlite(sqlite_db, samples)
+        print(f"Seeded SQLite with {rows} rows in {time.perf_counter() - start:.1f}s")
+        start = time.perf_counter()
+        seed_columnar(columnar_db, samples)
+        print(f"Seeded columnar store with {rows} rows in {time.perf_counter() - start:.1f}s")
+
+        queries = {
+            "get_energy_stats (all)": lambda db: db.get_energy_stats(None, hours),
+            "get_energy_stats (device)": lambda db: db.get_energy_stats(device_id, hours),
+            "get_energy_timeline (all)": lambda db: db.get_energy_timeline(None, hours),
+            "get_energy_timeline (device)": lambda db: db.get_energy_timeline(device_id, hours),
+        }
+
+        print(f"\n{'query':<32}{'sqlite ms':>12}{'columnar ms':>14}{'speedup':>10}")
+        for name, query in queries.items():
+            sqlite_s = timed(lambda: query(sqlite_db), repeat)
+            columnar_s = timed(lambda: query(columnar_db), repeat)
+            print(f"{name:<32}{sqlite_s * 1000:>12.1f}{columnar_s * 1000:>14.1f}{sqlite_s / columnar_s:>9.1f}x")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--devices", type=int, default=500)
+    parser.add_argument("--hours", type=int, default=24)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+    run(args.rows, args.devices, args.hours, args.repeat)
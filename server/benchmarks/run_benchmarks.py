@@ -0,0 +1,382 @@
+"""
+Micro-benchmarks for the server hot paths. Runs offline: no boards, no
+Google recognition, no open ports.
+
+    cd server
+    python benchmarks/run_benchmarks.py                  # full suite
+    python benchmarks/run_benchmarks.py --rows 50000     # smaller seeded DB
+    python benchmarks/run_benchmarks.py --only database,broadcast
+    python benchmarks/run_benchmarks.py --compare results/old.json results/new.json
+
+Every run is saved as JSON under benchmarks/results/ (named after the git
+commit) so runs can be compared across commits.
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from typing import Callable, Dict
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+SERVER_DIR = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, SERVER_DIR)
+
+from audio_ingest import AudioBufferManager  # noqa: E402
+from bench_energy_store import generate_samples, seed_sqlite  # noqa: E402
+from database import Database  # noqa: E402
+from energy_simulator import EnergySimulator  # noqa: E402
+from voice_commands import parse_partial_command, parse_voice_command  # noqa: E402
+
+# Mirrors the audio settings in main.py
+AUDIO_BYTES_PER_SECOND = 16000 * 2 * 1
+TARGET_BUFFER_SIZE = int(AUDIO_BYTES_PER_SECOND * 3.0)
+PACKET_SIZE = 1024
+
+# Energy queries look back QUERY_HOURS; seeded rows span the last
+# SEED_SPAN_HOURS, so a cached seed stays fully inside the window for
+# QUERY_HOURS - SEED_SPAN_HOURS and every run scans the same rows. The cache
+# is re-seeded an hour before that (slack for the seeding itself).
+QUERY_HOURS = 24
+SEED_SPAN_HOURS = 12
+SEED_MAX_AGE_SECONDS = (QUERY_HOURS - SEED_SPAN_HOURS - 1) * 3600
+
+TRANSCRIPTS = [
+    "turn light one red",
+    "turn on the lights",
+    "switch light two off",
+    "make both lights purple",
+    "turn led to on please",
+    "set light one to yellow",
+    "what is the weather like today",
+    "turn off",
+]
+
+
+def measure(fn: Callable[[], None], ops_per_round: int = 1, rounds: int = 5, warmup: int = 1) -> Dict:
+    """Time `fn` over several rounds; reports per-operation wall and CPU time"""
+    for _ in range(warmup):
+        fn()
+
+    wall, cpu = [], []
+    for _ in range(rounds):
+        wall_start = time.perf_counter()
+        cpu_start = time.process_time()
+        fn()
+        cpu.append((time.process_time() - cpu_start) / ops_per_round)
+        wall.append((time.perf_counter() - wall_start) / ops_per_round)
+
+    return {
+        'ops_per_round': ops_per_round,
+        'rounds': rounds,
+        'wall_us_min': min(wall) * 1e6,
+        'wall_us_median': statistics.median(wall) * 1e6,
+        'cpu_us_median': statistics.median(cpu) * 1e6,
+    }
+
+
+# --- Benchmark groups ---
+
+def bench_audio(args) -> Dict:
+    packet = os.urandom(PACKET_SIZE)
+    packets_per_buffer = TARGET_BUFFER_SIZE // PACKET_SIZE + 1
+    results = {}
+
+    def single_board():
+        buffers = AudioBufferManager(TARGET_BUFFER_SIZE, 1.0, AUDIO_BYTES_PER_SECOND // 2, lambda audio, addr: None)
+        addr = ("10.0.0.1", 40000)
+        for _ in range(packets_per_buffer):
+            buffers.add_packet(packet, addr, 0.0)
+
+    boards = [(f"10.0.{i // 256}.{i % 256}", 40000) for i in range(args.devices)]
+
+    def fleet():
+        buffers = AudioBufferManager(TARGET_BUFFER_SIZE, 1.0, AUDIO_BYTES_PER_SECOND // 2, lambda audio, addr: None)
+        for _ in range(20):
+            for addr in boards:
+                buffers.add_packet(packet, addr, 0.0)
+        buffers.flush_stale(10.0)
+
+    results['add_packet_single_board'] = measure(single_board, packets_per_buffer)
+    results['add_packet_fleet'] = measure(fleet, 20 * len(boards))
+    return results
+
+
+def bench_parsing(args) -> Dict:
+    transcripts = TRANSCRIPTS * 1000
+
+    def parse_all():
+        for text in transcripts:
+            parse_voice_command(text)
+
+    def parse_partials():
+        for text in transcripts:
+            words = text.split()
+            for i in range(1, len(words) + 1):
+                parse_partial_command(" ".join(words[:i]))
+
+    partial_count = sum(len(text.split()) for text in transcripts)
+    return {
+        'parse_voice_command': measure(parse_all, len(transcripts)),
+        'parse_partial_command': measure(parse_partials, partial_count),
+    }
+
+
+def seeded_database(args) -> Database:
+    """SQLite DB with `args.rows` energy logs, cached between runs until it ages out"""
+    cache_dir = os.path.join(BENCH_DIR, ".cache")
+    os.makedirs(cache_dir, exist_ok=True)
+    path = os.path.join(cache_dir, f"seeded-{args.rows}-{args.devices}.db")
+
+    if os.path.exists(path) and time.time() - os.path.getmtime(path) > SEED_MAX_AGE_SECONDS:
+        print(f"Cached seed {path} is older than {SEED_MAX_AGE_SECONDS // 3600}h, re-seeding...")
+        os.remove(path)
+
+    if not os.path.exists(path):
+        print(f"Seeding {args.rows} energy rows into {path} (cached for later runs)...")
+        tmp_path = path + ".tmp"
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        db = Database(tmp_path)
+        seed_sqlite(db, generate_samples(args.rows, args.devices, SEED_SPAN_HOURS))
+
+        rng = random.Random(2)
+        conn = db.get_connection()
+        conn.executemany(
+            "INSERT INTO devices (device_id, ip_address, last_seen, status) VALUES (?, ?, ?, 'online')",
+            ((f"esp32_10_0_{i // 256}_{i % 256}", f"10.0.{i // 256}.{i % 256}", datetime.now())
+             for i in range(args.devices)),
+        )
+        conn.executemany(
+            "INSERT INTO commands (command_text, command_sent, device_id, success) VALUES (?, ?, ?, 1)",
+            ((rng.choice(TRANSCRIPTS), "LED1_RED", f"esp32_10_0_0_{rng.randrange(min(args.devices, 256))}")
+             for _ in range(args.rows // 4)),
+        )
+        conn.commit()
+        conn.close()
+        shutil.move(tmp_path, path)
+
+    # Work on a copy so write benchmarks never grow the cached seed
+    work_dir = tempfile.mkdtemp()
+    work_path = os.path.join(work_dir, "bench.db")
+    shutil.copy(path, work_path)
+    return Database(work_path)
+
+
+def bench_database(args) -> Dict:
+    db = seeded_database(args)
+    device_id = "esp32_10_0_0_1"
+    colors = ["RED", "GREEN", "BLUE", "OFF"]
+    rng = random.Random(4)
+
+    results = {
+        'upsert_device': measure(lambda: db.upsert_device(device_id, "10.0.0.1"), rounds=50),
+        'update_device_color': measure(
+            lambda: db.update_device_color(device_id, "LED1", rng.choice(colors)), rounds=50),
+        'get_device': measure(lambda: db.get_device(device_id), rounds=50),
+        'get_all_devices': measure(db.get_all_devices, rounds=20),
+        'add_command': measure(lambda: db.add_command("turn light one red", "LED1_RED", device_id), rounds=50),
+        'get_recent_commands': measure(lambda: db.get_recent_commands(50), rounds=5),
+        'add_energy_log': measure(lambda: db.add_energy_log(device_id, 0.066, 12.5, "LED1_RED"), rounds=50),
+        'get_energy_stats_all': measure(lambda: db._query_energy_stats(None, QUERY_HOURS)),
+        'get_energy_stats_device': measure(lambda: db._query_energy_stats(device_id, QUERY_HOURS)),
+        'get_energy_timeline_all': measure(lambda: db._query_energy_timeline(None, QUERY_HOURS)),
+        'get_energy_timeline_device': measure(lambda: db._query_energy_timeline(device_id, QUERY_HOURS)),
+        'get_energy_stats_cached': measure(lambda: db.get_energy_stats(None, QUERY_HOURS), rounds=50),
+    }
+    shutil.rmtree(os.path.dirname(db.db_path), ignore_errors=True)
+    return results
+
+
+def bench_energy_sim(args) -> Dict:
+    sim = EnergySimulator()
+    device_ids = [f"esp32_10_0_{i // 256}_{i % 256}" for i in range(args.devices)]
+    rng = random.Random(3)
+    updates = [(rng.choice(device_ids), rng.choice(["LED1", "LED2", "ALL"]), rng.choice(["RED", "WHITE", "ON", "OFF"]))
+               for _ in range(50_000)]
+
+    def apply_updates():
+        for device_id, led_id, color in updates:
+            sim.update_device_state(device_id, led_id, color)
+
+    return {'update_device_state': measure(apply_updates, len(updates))}
+
+
+def bench_broadcast(args) -> Dict:
+    from starlette.websockets import WebSocket, WebSocketState
+    from connection_manager import ConnectionManager
+
+    async def receive():
+        return {"type": "websocket.connect"}
+
+    async def send(message):
+        pass
+
+    manager = ConnectionManager()
+    for _ in range(args.clients):
+        websocket = WebSocket({"type": "websocket", "path": "/ws", "headers": [], "query_string": b""}, receive, send)
+        websocket.client_state = WebSocketState.CONNECTED
+        websocket.application_state = WebSocketState.CONNECTED
+        manager.active_connections.append(websocket)
+
+    message = {
+        "type": "command_executed",
+        "data": {"device_id": "esp32_10_0_0_1", "command_text": "turn light one red", "led_id": "LED1",
+                 "color_led1": "RED", "color_led2": None, "success": True},
+        "timestamp": datetime.now().isoformat(),
+    }
+    async def send_json_per_client():
+        # Previous behaviour: every client re-serializes the message
+        for connection in manager.active_connections:
+            await connection.send_json(message)
+
+    loop = asyncio.new_event_loop()
+    try:
+        results = {
+            'broadcast': measure(lambda: loop.run_until_complete(manager.broadcast(message)), rounds=20),
+            'broadcast_send_json_per_client': measure(lambda: loop.run_until_complete(send_json_per_client()),
+                                                      rounds=20),
+        }
+    finally:
+        loop.close()
+    for result in results.values():
+        result['clients'] = args.clients
+    return results
+
+
+def bench_serialization(args) -> Dict:
+    from fastapi.encoders import jsonable_encoder
+    from fastapi.responses import JSONResponse
+    from serialization import EncodedBodyCache, FastJSONResponse
+
+    devices = {"devices": [
+        {"device_id": f"esp32_10_0_{i // 256}_{i % 256}", "ip_address": f"10.0.{i // 256}.{i % 256}",
+         "last_seen": datetime.now().isoformat(sep=" "), "current_color_led1": "RED",
+         "current_color_led2": "ON", "status": "online"}
+        for i in range(args.devices)
+    ]}
+    cache = EncodedBodyCache()
+
+    return {
+        'devices_default_encoder': measure(lambda: JSONResponse(jsonable_encoder(devices)), rounds=20),
+        'devices_fast_encoder': measure(lambda: FastJSONResponse(devices), rounds=20),
+        'devices_cached_body': measure(lambda: cache.response("devices", 0, lambda: devices), rounds=20),
+    }
+
+
+def bench_projection(args) -> Dict:
+    from energy_projection import project_energy
+
+    rng = random.Random(4)
+    hours = 30 * 24
+    event_hours = range(0, hours, 3)
+    schedules = {
+        f"room{i}": ([hour * 3600 + rng.random() * 1800 for hour in event_hours],
+                     [rng.choice(["LED1", "LED2", "ALL"]) for _ in event_hours],
+                     [rng.choice(["RED", "WHITE", "OFF"]) for _ in event_hours])
+        for i in range(args.devices)
+    }
+    result = measure(lambda: project_energy(schedules, hours), rounds=3)
+    result['events'] = sum(len(times) for times, _, _ in schedules.values())
+    return {'project_energy_month': result}
+
+
+GROUPS = {
+    'audio': bench_audio,
+    'parsing': bench_parsing,
+    'database': bench_database,
+    'energy_sim': bench_energy_sim,
+    'broadcast': bench_broadcast,
+    'serialization': bench_serialization,
+    'projection': bench_projection,
+}
+
+
+# --- Results ---
+
+def git_commit() -> str:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=SERVER_DIR,
+                                       stderr=subprocess.DEVNULL, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def print_results(results: Dict):
+    print(f"\n{'benchmark':<45}{'median us/op':>15}{'cpu us/op':>12}")
+    for group, group_results in results.items():
+        for name, result in group_results.items():
+            print(f"{group + '.' + name:<45}{result['wall_us_median']:>15.2f}{result['cpu_us_median']:>12.2f}")
+
+
+def compare(old_path: str, new_path: str):
+    with open(old_path) as f:
+        old = json.load(f)
+    with open(new_path) as f:
+        new = json.load(f)
+
+    print(f"{old['meta']['commit']} -> {new['meta']['commit']}")
+    print(f"\n{'benchmark':<45}{'old us/op':>12}{'new us/op':>12}{'change':>10}")
+    for group, group_results in new['results'].items():
+        for name, result in group_results.items():
+            previous = old['results'].get(group, {}).get(name)
+            if previous is None:
+                continue
+            before, after = previous['wall_us_median'], result['wall_us_median']
+            change = (after - before) / before * 100 if before else 0.0
+            print(f"{group + '.' + name:<45}{before:>12.2f}{after:>12.2f}{change:>+9.1f}%")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=2_000_000, help="energy rows in the seeded DB")
+    parser.add_argument("--devices", type=int, default=500, help="fleet size")
+    parser.add_argument("--clients", type=int, default=500, help="WebSocket clients for broadcast")
+    parser.add_argument("--only", help="comma separated groups: " + ",".join(GROUPS))
+    parser.add_argument("--output", help="results file (default: benchmarks/results/<commit>-<time>.json)")
+    parser.add_argument("--compare", nargs=2, metavar=("OLD", "NEW"), help="compare two result files")
+    args = parser.parse_args()
+
+    if args.compare:
+        compare(*args.compare)
+        return
+
+    groups = args.only.split(",") if args.only else list(GROUPS)
+    results = {}
+    for group in groups:
+        print(f"[BENCH] Running {group}...")
+        results[group] = GROUPS[group](args)
+
+    commit = git_commit()
+    report = {
+        'meta': {
+            'commit': commit,
+            'timestamp': datetime.now().isoformat(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'params': {'rows': args.rows, 'devices': args.devices, 'clients': args.clients},
+        },
+        'results': results,
+    }
+
+    output = args.output
+    if not output:
+        os.makedirs(os.path.join(BENCH_DIR, "results"), exist_ok=True)
+        output = os.path.join(BENCH_DIR, "results", f"{commit}-{datetime.now():%Y%m%d-%H%M%S}.json")
+    with open(output, "w") as f:
+        json.dump(report, f, indent=2)
+
+    print_results(results)
+    print(f"\nSaved results to {output}")
+
+
+if __name__ == "__main__":
+    main()
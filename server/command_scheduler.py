@@ -0,0 +1,243 @@
+import threading
+import time
+from collections import OrderedDict
+from functools import partial
+from typing import Callable, Dict, Optional
+
+
+def expected_state(command_str: str) -> Dict[str, str]:
+    """LED colors a board reports in its STATUS message after applying `command_str`"""
+    led_part, _, color = command_str.partition("_")
+    led1_color = "WHITE" if color == "ON" else color
+    led2_color = "OFF" if color == "OFF" else "ON"
+
+    if led_part == "LED1":
+        return {"LED1": led1_color}
+    if led_part == "LED2":
+        return {"LED2": led2_color}
+    if led_part == "ALL":
+        return {"LED1": led1_color, "LED2": led2_color}
+    return {}
+
+
+class CommandScheduler:
+    """
+    Outbound queue for board commands.
+
+    Commands are kept per device and per LED target with last-write-wins, so a
+    burst of commands for the same LED only sends (and persists) the newest
+    one. Sends to one board are paced by `min_interval_seconds`. A sent command
+    stays in flight until a STATUS heartbeat shows the expected colors; it is
+    resent with exponential backoff and dropped after `max_retries`.
+    """
+
+    def __init__(self, sock, control_port: int, min_interval_seconds: float = 0.05,
+                 ack_timeout_seconds: float = 0.5, max_retries: int = 3,
+                 backoff_factor: float = 2.0):
+        self.sock = sock
+        self.control_port = control_port
+        self.min_interval_seconds = min_interval_seconds
+        self.ack_timeout_seconds = ack_timeout_seconds
+        self.max_retries = max_retries
+        self.backoff_factor = backoff_factor
+
+        self.devices: Dict[str, Dict] = {}
+        self.stats = {'submitted': 0, 'coalesced': 0, 'sent': 0, 'retries': 0,
+                      'confirmed': 0, 'failed': 0}
+        self._cond = threading.Condition()
+
+    def start(self):
+        threading.Thread(target=self._run, daemon=True).start()
+        print("[SCHEDULER] Command scheduler started")
+
+    def submit(self, device_id: str, ip_address: str, command_str: str,
+               on_dispatch: Optional[Callable[[str, Dict[str, str]], None]] = None,
+               on_failed: Optional[Callable[[str, Dict[str, str]], None]] = None):
+        """
+        Queue a command for a board. `on_dispatch` runs once when the command is
+        first sent and `on_failed` if it is never confirmed; neither runs for a
+        command that was superseded while still queued. Both are called with the
+        command string and expected LED colors as sent, which are narrower than
+        submitted when a newer single-LED command took one LED away from an ALL.
+        """
+        led_key = command_str.partition("_")[0]
+        command = {
+            'command_str': command_str,
+            'expected': expected_state(command_str),
+            'on_dispatch': on_dispatch,
+            'on_failed': on_failed,
+            'attempts': 0,
+            'deadline': 0.0,
+        }
+
+        with self._cond:
+            device = self.devices.setdefault(device_id, {
+                'ip_address': ip_address,
+                'pending': OrderedDict(),
+                'in_flight': {},
+                'next_send_time': 0.0,
+            })
+            device['ip_address'] = ip_address
+
+            # ALL overrides both single-LED targets; newer commands also stop
+            # the retries of whatever they replace.
+            superseded = ["LED1", "LED2", "ALL"] if led_key == "ALL" else [led_key]
+            for key in superseded:
+                if device['pending'].pop(key, None) is not None:
+                    self.stats['coalesced'] += 1
+                device['in_flight'].pop(key, None)
+
+            # A single-LED command takes its LED away from an older ALL, which
+            # keeps (and resends) only the LED it still owns
+            if led_key != "ALL":
+                if self._narrow_all(device['pending'], led_key):
+                    self.stats['coalesced'] += 1
+                self._narrow_all(device['in_flight'], led_key)
+
+            device['pending'][led_key] = command
+            self.stats['submitted'] += 1
+            self._cond.notify()
+
+    @staticmethod
+    def _narrow_all(commands: Dict, led_key: str) -> bool:
+        """
+        Drop `led_key` from the ALL command in `commands`. Returns True if the
+        ALL command was removed because no LED was left to it.
+        """
+        command = commands.get("ALL")
+        if command is None:
+            return False
+
+        command['expected'].pop(led_key, None)
+        if not command['expected']:
+            del commands["ALL"]
+            return True
+
+        # Re-key under the remaining LED, keeping its place in the queue
+        remaining_led, color = next(iter(command['expected'].items()))
+        command['command_str'] = f"{remaining_led}_{color}"
+        items = [(remaining_led if key == "ALL" else key, value) for key, value in commands.items()]
+        commands.clear()
+        commands.update(items)
+        return False
+
+    def confirm(self, device_id: str, color_led1: str, color_led2: str) -> bool:
+        """Match a STATUS heartbeat against the commands in flight for this board"""
+        reported = {"LED1": color_led1, "LED2": color_led2}
+        confirmed = False
+
+        with self._cond:
+            device = self.devices.get(device_id)
+            if not device:
+                return False
+
+            for key, command in list(device['in_flight'].items()):
+                if all(reported[led] == color for led, color in command['expected'].items()):
+                    del device['in_flight'][key]
+                    self.stats['confirmed'] += 1
+                    confirmed = True
+                    print(f"[SCHEDULER] '{command['command_str']}' confirmed by {device_id} "
+                          f"after {command['attempts']} send(s)")
+
+        return confirmed
+
+    def _run(self):
+        while True:
+            with self._cond:
+                now = time.time()
+                sends, callbacks, wake_at = self._collect(now)
+                if not sends and not callbacks:
+                    self._cond.wait(timeout=wake_at - now)
+                    continue
+            self._deliver(sends, callbacks)
+
+    def run_pending(self, now: Optional[float] = None) -> float:
+        """
+        One pass of the scheduler loop at time `now`: sends whatever is due and
+        runs the callbacks. Returns when the next pass is needed.
+        """
+        with self._cond:
+            sends, callbacks, wake_at = self._collect(time.time() if now is None else now)
+        self._deliver(sends, callbacks)
+        return wake_at
+
+    def _collect(self, now: float):
+        sends = []
+        callbacks = []
+        wake_at = now + 0.25
+
+        for device_id, device in self.devices.items():
+            if now >= device['next_send_time']:
+                command = self._next_command(device_id, device, now, callbacks)
+                if command:
+                    sends.append(self._prepare_send(device, command, now))
+            wake_at = min(wake_at, self._next_wakeup(device, now))
+
+        return sends, callbacks, wake_at
+
+    def _deliver(self, sends: list, callbacks: list):
+        for command_bytes, control_addr in sends:
+            try:
+                self.sock.sendto(command_bytes, control_addr)
+            except OSError as e:
+                print(f"[SCHEDULER] Error sending to {control_addr}: {e}")
+
+        # Callbacks touch the DB and broadcast, so run them outside the lock
+        for callback in callbacks:
+            try:
+                callback()
+            except Exception as e:
+                print(f"[SCHEDULER] Error in command callback: {e}")
+
+    def _next_command(self, device_id: str, device: Dict, now: float, callbacks: list) -> Optional[Dict]:
+        """Pick the next command to (re)send to a board, if any is due"""
+        for key, command in list(device['in_flight'].items()):
+            if now < command['deadline']:
+                continue
+            if command['attempts'] > self.max_retries:
+                del device['in_flight'][key]
+                self.stats['failed'] += 1
+                print(f"[SCHEDULER] No confirmation for '{command['command_str']}' from {device_id}. Giving up.")
+                if command['on_failed']:
+                    callbacks.append(partial(command['on_failed'], command['command_str'],
+                                             dict(command['expected'])))
+                continue
+            self.stats['retries'] += 1
+            return command
+
+        if device['pending']:
+            key, command = device['pending'].popitem(last=False)
+            device['in_flight'][key] = command
+            if command['on_dispatch']:
+                callbacks.append(partial(command['on_dispatch'], command['command_str'],
+                                         dict(command['expected'])))
+            return command
+
+        return None
+
+    def _prepare_send(self, device: Dict, command: Dict, now: float):
+        control_addr = (device['ip_address'], self.control_port)
+
+        command['attempts'] += 1
+        timeout = self.ack_timeout_seconds * (self.backoff_factor ** (command['attempts'] - 1))
+        command['deadline'] = now + timeout
+        device['next_send_time'] = now + self.min_interval_seconds
+        self.stats['sent'] += 1
+        print(f"[SCHEDULER] Sending '{command['command_str']}' to {control_addr} (attempt {command['attempts']})")
+        return command['command_str'].encode('utf-8'), control_addr
+
+    def _next_wakeup(self, device: Dict, now: float) -> float:
+        times = [command['deadline'] for command in device['in_flight'].values()]
+        if device['pending']:
+            times.append(now)
+        if not times:
+            return now + 0.25
+        # Nothing can go out before the pacing interval has passed
+        return max(min(times), device['next_send_time'], now)
+
+    def get_stats(self) -> Dict:
+        with self._cond:
+            stats = dict(self.stats)
+            stats['pending'] = sum(len(d['pending']) for d in self.devices.values())
+            stats['in_flight'] = sum(len(d['in_flight']) for d in self.devices.values())
+        return stats
@@ -0,0 +1,28 @@
+from typing import List
+
+from fastapi import WebSocket
+
+from serialization import dumps
+
+
+class ConnectionManager:
+    def __init__(self):
+        self.active_connections: List[WebSocket] = []
+
+    async def connect(self, websocket: WebSocket):
+        await websocket.accept()
+        self.active_connections.append(websocket)
+        print(f"[WEBSOCKET] New connection. Total: {len(self.active_connections)}")
+
+    def disconnect(self, websocket: WebSocket):
+        self.active_connections.remove(websocket)
+        print(f"[WEBSOCKET] Connection closed. Total: {len(self.active_connections)}")
+
+    async def broadcast(self, message: dict):
+        # Encode once and send the same text frame to every client
+        text = dumps(message).decode("utf-8")
+        for connection in self.active_connections:
+            try:
+                await connection.send_text(text)
+            except Exception as e:
+                print(f"[WEBSOCKET] Broadcast to a client failed: {e}")
@@ -1,13 +1,36 @@
 import sqlite3
+import threading
 from datetime import datetime, timezone
 from typing import List, Dict, Optional
 import json
 
+from query_cache import QueryCache
+
 class Database:
-    def __init__(self, db_path="home_automation.db"):
+    def __init__(self, db_path="home_automation.db", energy_backend="sqlite", energy_store_path="energy_store",
+                 query_cache_ttl_seconds=5.0):
         self.db_path = db_path
         self.init_database()
+
+        # Energy stats/timeline results, invalidated by add_energy_log
+        self.query_cache = QueryCache(ttl_seconds=query_cache_ttl_seconds)
+        # Write counters, used to reuse encoded API responses until the data changes
+        self.table_versions = {'devices': 0, 'commands': 0}
+        self._versions_lock = threading.Lock()
+
+        # Optional columnar backend for energy samples (see energy_store.py)
+        self.energy_store = None
+        if energy_backend == "columnar":
+            from energy_store import ColumnarEnergyStore
+            self.energy_store = ColumnarEnergyStore(energy_store_path)
+            if self.energy_store.is_empty():
+                self.backfill_energy_store()
     
+    def _bump_version(self, table: str):
+        # Writers run on several threads; an unlocked += can lose an increment
+        with self._versions_lock:
+            self.table_versions[table] += 1
+
     def get_connection(self):
         conn = sqlite3.connect(self.db_path)
         conn.row_factory = sqlite3.Row
@@ -79,6 +102,7 @@ class Database:
         
         conn.commit()
         conn.close()
+        self._bump_version('devices')
     
     # --- MODIFIED: update_device_color (New "ALL" Logic) ---
     def update_device_color(self, device_id: str, led_id: str, color: str):
@@ -124,6 +148,7 @@ class Database:
         finally:
             conn.commit()
             conn.close()
+            self._bump_version('devices')
     
     def get_device(self, device_id: str) -> Optional[Dict]:
         conn = self.get_connection()
@@ -145,7 +170,7 @@ class Database:
         
         return [dict(row) for row in rows]
     
-    def add_command(self, command_text: str, command_sent: str, device_id: str, success: bool = True):
+    def add_command(self, command_text: str, command_sent: str, device_id: str, success: bool = True) -> int:
         conn = self.get_connection()
         cursor = conn.cursor()
         
@@ -153,9 +178,20 @@ class Database:
             INSERT INTO commands (command_text, command_sent, device_id, success)
             VALUES (?, ?, ?, ?)
         ''', (command_text, command_sent, device_id, 1 if success else 0))
+        command_id = cursor.lastrowid
         
         conn.commit()
         conn.close()
+        self._bump_version('commands')
+        return command_id
+    
+    def set_command_success(self, command_id: int, success: bool):
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        cursor.execute('UPDATE commands SET success = ? WHERE id = ?', (1 if success else 0, command_id))
+        conn.commit()
+        conn.close()
+        self._bump_version('commands')
     
     def get_recent_commands(self, limit: int = 50) -> List[Dict]:
         conn = self.get_connection()
@@ -173,6 +209,11 @@ class Database:
         return [dict(row) for row in rows]
     
     def add_energy_log(self, device_id: str, power_watts: float, duration_seconds: float, color: str):
+        if self.energy_store:
+            self.energy_store.add_energy_log(device_id, power_watts, duration_seconds, color)
+            self.query_cache.invalidate(device_id)
+            return
+
         energy_wh = (power_watts * duration_seconds) / 3600
         
         conn = self.get_connection()
@@ -185,8 +226,45 @@ class Database:
         
         conn.commit()
         conn.close()
+        self.query_cache.invalidate(device_id)
     
+    def backfill_energy_store(self) -> int:
+        """Copies the energy_logs history into the columnar store, oldest first"""
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        cursor.execute('''
+            SELECT
+                CAST(strftime('%s', timestamp) AS INTEGER) as epoch,
+                device_id,
+                power_watts,
+                duration_seconds,
+                COALESCE(color, '') as color
+            FROM energy_logs
+            WHERE timestamp IS NOT NULL AND device_id IS NOT NULL
+            AND power_watts IS NOT NULL AND duration_seconds IS NOT NULL
+            ORDER BY timestamp ASC
+        ''')
+
+        count = 0
+        for row in cursor:
+            self.energy_store.add_energy_log(row['device_id'], row['power_watts'], row['duration_seconds'],
+                                             row['color'], timestamp=row['epoch'])
+            count += 1
+        conn.close()
+
+        self.energy_store.flush()
+        if count:
+            print(f"[DATABASE] Backfilled {count} energy logs into the columnar store")
+        return count
+
     def get_energy_stats(self, device_id: str = None, hours: int = 24) -> Dict:
+        return self.query_cache.get_or_compute(
+            "stats", device_id, hours, lambda: self._query_energy_stats(device_id, hours))
+
+    def _query_energy_stats(self, device_id: str = None, hours: int = 24) -> Dict:
+        if self.energy_store:
+            return self.energy_store.get_energy_stats(device_id, hours)
+
         conn = self.get_connection()
         cursor = conn.cursor()
         
@@ -214,6 +292,13 @@ class Database:
         return {'total_energy_wh': 0, 'total_duration': 0, 'avg_power': 0, 'entries': 0}
     
     def get_energy_timeline(self, device_id: str = None, hours: int = 24) -> List[Dict]:
+        return self.query_cache.get_or_compute(
+            "timeline", device_id, hours, lambda: self._query_energy_timeline(device_id, hours))
+
+    def _query_energy_timeline(self, device_id: str = None, hours: int = 24) -> List[Dict]:
+        if self.energy_store:
+            return self.energy_store.get_energy_timeline(device_id, hours)
+
         conn = self.get_connection()
         cursor = conn.cursor()
         
@@ -0,0 +1,123 @@
+from itertools import chain
+from typing import Dict, Optional, Sequence, Tuple
+
+import numpy as np
+
+from energy_simulator import EnergySimulator
+
+# LED targets of a schedule event; ALL drives both LEDs
+LED_TARGETS = ["LED1", "LED2", "ALL"]
+
+# Per device: (seconds from projection start, led_ids, colors), one entry per event
+ScheduleColumns = Tuple[Sequence[float], Sequence[str], Sequence[str]]
+
+
+def _codes(values: list):
+    """Unique upper-cased values and the index of every value among them"""
+    # A dict lookup per value is about twice as fast as np.unique on strings
+    index: Dict[str, int] = {}
+    codes = np.fromiter((index.setdefault(value, len(index)) for value in values),
+                        dtype=np.int64, count=len(values))
+    return [value.upper() for value in index], codes
+
+
+def project_energy(schedules: Dict[str, ScheduleColumns], hours: int,
+                   power_map_led1: Optional[Dict[str, float]] = None,
+                   power_map_led2: Optional[Dict[str, float]] = None) -> Dict:
+    """
+    Projects energy for per-device LED schedules over the next `hours`.
+
+    Every LED starts OFF and holds each scheduled color until its next event
+    (events at the same time apply in list order). LED2 is ON/OFF and ALL
+    drives both, as in Database.update_device_color. All LEDs of all devices
+    are laid end to end on one time axis, so the hourly energy of the whole
+    fleet comes out of a single cumulative sum and one `searchsorted`.
+    Power maps default to the EnergySimulator tables and can be overridden
+    for what-if comparisons.
+    """
+    power_map_led1 = {k.upper(): v for k, v in (power_map_led1 or EnergySimulator.POWER_MAP_LED1).items()}
+    power_map_led2 = {k.upper(): v for k, v in (power_map_led2 or EnergySimulator.POWER_MAP_LED2).items()}
+
+    if hours < 1:
+        raise ValueError("hours must be at least 1")
+
+    device_ids = list(schedules.keys())
+    channels = len(device_ids) * 2
+    if channels == 0:
+        empty = np.zeros((0, hours))
+        return {'device_ids': [], 'device_hourly_wh': empty, 'hourly_wh': np.zeros(hours),
+                'device_total_wh': np.zeros(0)}
+
+    horizon = hours * 3600.0
+    span = horizon + 1.0
+
+    counts = []
+    for device_id in device_ids:
+        times, led_ids, colors = schedules[device_id]
+        if not len(times) == len(led_ids) == len(colors):
+            raise ValueError(f"times, led_ids and colors of '{device_id}' differ in length")
+        counts.append(len(times))
+
+    event_times = np.fromiter(chain.from_iterable(schedules[d][0] for d in device_ids),
+                              dtype=np.float64, count=sum(counts))
+    if not np.isfinite(event_times).all():
+        raise ValueError("times must be finite")
+    event_device = np.repeat(np.arange(len(device_ids)), counts)
+
+    # Map LED targets and colors to small lookup tables instead of per-event work
+    led_names, led_codes = _codes(list(chain.from_iterable(schedules[d][1] for d in device_ids)))
+    unknown = [name for name in led_names if name not in LED_TARGETS]
+    if unknown:
+        raise ValueError(f"Invalid led_id '{unknown[0]}'. Must be one of {LED_TARGETS}")
+    event_target = np.array([LED_TARGETS.index(name) for name in led_names], dtype=np.int64)[led_codes]
+
+    color_names, color_codes = _codes(list(chain.from_iterable(schedules[d][2] for d in device_ids)))
+    led2_colors = ["ON" if color != "OFF" else "OFF" for color in color_names]
+    # LED1 power for a LED1 event, LED1 power for an ALL event (ON means WHITE), LED2 power
+    led1_power = np.array([power_map_led1.get(c, 0.0) for c in color_names])[color_codes]
+    all_power = np.array([power_map_led1.get("WHITE" if c == "ON" else c, 0.0) for c in color_names])[color_codes]
+    led2_power = np.array([power_map_led2.get(c, 0.0) for c in led2_colors])[color_codes]
+
+    # Expand to (channel, time, power) rows; each channel starts with an OFF row at t=0
+    drives_led1 = event_target != 1
+    drives_led2 = event_target != 0
+    channel = np.concatenate((np.arange(channels), event_device[drives_led1] * 2, event_device[drives_led2] * 2 + 1))
+    times = np.clip(np.concatenate((np.zeros(channels), event_times[drives_led1], event_times[drives_led2])),
+                    0.0, horizon)
+    power = np.concatenate((
+        np.zeros(channels),
+        np.where(event_target == 0, led1_power, all_power)[drives_led1],
+        led2_power[drives_led2],
+    ))
+
+    # Sort by channel, then time; the stable sort keeps input order for ties
+    # (and the initial OFF rows, which come first, ahead of events at t=0)
+    order = np.argsort(channel * span + times, kind="stable")
+    channel, times, power = channel[order], times[order], power[order]
+
+    # Each event holds until the next one on its channel (or the horizon)
+    ends = np.empty_like(times)
+    ends[:-1] = times[1:]
+    ends[-1] = horizon
+    last_in_channel = np.append(channel[1:] != channel[:-1], True)
+    ends[last_in_channel] = horizon
+
+    # Cumulative energy (watt-seconds) at the start of every segment on the global axis
+    position = channel * span + times
+    segment_ws = power * (ends - times)
+    cumulative = np.concatenate(([0.0], np.cumsum(segment_ws)[:-1]))
+
+    # Evaluate the cumulative energy at every hour boundary of every channel
+    boundaries = (np.arange(channels)[:, None] * span) + (np.arange(hours + 1) * 3600.0)[None, :]
+    idx = np.searchsorted(position, boundaries, side="right") - 1
+    energy_at = cumulative[idx] + power[idx] * (boundaries - position[idx])
+
+    channel_hourly_wh = np.diff(energy_at, axis=1) / 3600.0
+    device_hourly_wh = channel_hourly_wh.reshape(len(device_ids), 2, hours).sum(axis=1)
+
+    return {
+        'device_ids': device_ids,
+        'device_hourly_wh': device_hourly_wh,
+        'hourly_wh': device_hourly_wh.sum(axis=0),
+        'device_total_wh': device_hourly_wh.sum(axis=1),
+    }
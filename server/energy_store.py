@@ -0,0 +1,211 @@
+import atexit
+import os
+import threading
+import time
+from array import array
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+
+try:
+    import numpy as np
+except ImportError:  # only needed by the columnar backend
+    np = None
+
+SECONDS_PER_DAY = 86400
+
+# Column name -> (array typecode used for appends, numpy dtype used for scans)
+COLUMNS = {
+    'epoch': ('q', '<i8'),
+    'device': ('I', '<u4'),
+    'color': ('B', 'u1'),
+    'power': ('f', '<f4'),
+    'duration': ('f', '<f4'),
+}
+
+
+class _Dictionary:
+    """Append-only string <-> integer code mapping persisted one entry per line"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.values: List[str] = []
+        self.codes: Dict[str, int] = {}
+        if os.path.exists(path):
+            with open(path) as f:
+                for line in f:
+                    self._add(line.rstrip("\n"))
+
+    def _add(self, value: str) -> int:
+        code = len(self.values)
+        self.values.append(value)
+        self.codes[value] = code
+        return code
+
+    def encode(self, value: str) -> int:
+        code = self.codes.get(value)
+        if code is None:
+            code = self._add(value)
+            with open(self.path, "a") as f:
+                f.write(value + "\n")
+        return code
+
+
+def _round_float32(value: float) -> float:
+    """Drop float32 storage noise (0.1979999989 -> 0.198) from per-row values"""
+    return float(f"{value:.7g}")
+
+
+class ColumnarEnergyStore:
+    """
+    Append-only energy log stored as one directory per UTC day, each holding
+    one fixed-width file per column. Writes are buffered and flushed in
+    batches; reads memory-map the column files and aggregate with NumPy.
+    """
+
+    FLUSH_EVERY = 256
+
+    def __init__(self, path: str = "energy_store"):
+        if np is None:
+            raise ImportError("The columnar energy backend requires numpy")
+
+        self.path = path
+        os.makedirs(path, exist_ok=True)
+        self.devices = _Dictionary(os.path.join(path, "devices.txt"))
+        self.colors = _Dictionary(os.path.join(path, "colors.txt"))
+
+        self._lock = threading.Lock()
+        self._pending = {name: array(typecode) for name, (typecode, _) in COLUMNS.items()}
+        self._pending_day: Optional[int] = None
+        atexit.register(self.flush)
+        print(f"[ENERGY_STORE] Columnar energy store at {path}")
+
+    def is_empty(self) -> bool:
+        """True until the first day segment has been written"""
+        self.flush()
+        return not any(entry.is_dir() for entry in os.scandir(self.path))
+
+    def _segment_dir(self, day: int) -> str:
+        date = datetime.fromtimestamp(day * SECONDS_PER_DAY, tz=timezone.utc)
+        return os.path.join(self.path, date.strftime("%Y%m%d"))
+
+    # --- Writes ---
+
+    def add_energy_log(self, device_id: str, power_watts: float, duration_seconds: float,
+                       color: str, timestamp: Optional[float] = None):
+        epoch = int(timestamp if timestamp is not None else time.time())
+        day = epoch // SECONDS_PER_DAY
+
+        with self._lock:
+            if self._pending_day is not None and day != self._pending_day:
+                self._flush_locked()
+            self._pending_day = day
+
+            self._pending['epoch'].append(epoch)
+            self._pending['device'].append(self.devices.encode(device_id))
+            self._pending['color'].append(self.colors.encode(color))
+            self._pending['power'].append(power_watts)
+            self._pending['duration'].append(duration_seconds)
+
+            if len(self._pending['epoch']) >= self.FLUSH_EVERY:
+                self._flush_locked()
+
+    def flush(self):
+        with self._lock:
+            self._flush_locked()
+
+    def _flush_locked(self):
+        if not self._pending['epoch']:
+            return
+
+        segment = self._segment_dir(self._pending_day)
+        os.makedirs(segment, exist_ok=True)
+        for name, values in self._pending.items():
+            with open(os.path.join(segment, name), "ab") as f:
+                values.tofile(f)
+            del values[:]
+
+    # --- Reads ---
+
+    def _load(self, hours: int, now: Optional[float] = None) -> Dict:
+        """Memory-map every segment overlapping the last `hours` and return the columns"""
+        self.flush()
+
+        now = time.time() if now is None else now
+        cutoff = int(now - hours * 3600)
+        parts = {name: [] for name in COLUMNS}
+
+        for day in range(cutoff // SECONDS_PER_DAY, int(now) // SECONDS_PER_DAY + 1):
+            segment = self._segment_dir(day)
+            if not os.path.isdir(segment):
+                continue
+
+            # A crash mid-flush can leave columns of unequal length; use the shortest
+            rows = min(os.path.getsize(os.path.join(segment, name)) // np.dtype(dtype).itemsize
+                       for name, (_, dtype) in COLUMNS.items())
+            if rows == 0:
+                continue
+            for name, (_, dtype) in COLUMNS.items():
+                parts[name].append(np.memmap(os.path.join(segment, name), dtype=dtype, mode="r", shape=(rows,)))
+
+        columns = {}
+        for name, (_, dtype) in COLUMNS.items():
+            columns[name] = np.concatenate(parts[name]) if parts[name] else np.empty(0, dtype=dtype)
+
+        mask = columns['epoch'] >= cutoff
+        return {name: values[mask] for name, values in columns.items()}
+
+    def _device_mask(self, columns: Dict, device_id: Optional[str]):
+        if not device_id:
+            return None
+        code = self.devices.codes.get(device_id)
+        if code is None:
+            return np.zeros(len(columns['epoch']), dtype=bool)
+        return columns['device'] == code
+
+    def get_energy_stats(self, device_id: str = None, hours: int = 24) -> Dict:
+        columns = self._load(hours)
+        mask = self._device_mask(columns, device_id)
+        if mask is not None:
+            columns = {name: values[mask] for name, values in columns.items()}
+
+        entries = len(columns['epoch'])
+        if entries == 0:
+            return {'total_energy_wh': 0, 'total_duration': 0, 'avg_power': 0, 'entries': 0}
+
+        power = columns['power'].astype(np.float64)
+        duration = columns['duration'].astype(np.float64)
+        return {
+            'total_energy_wh': float(np.dot(power, duration) / 3600),
+            'total_duration': float(duration.sum()),
+            'avg_power': float(power.mean()),
+            'entries': entries,
+        }
+
+    def get_energy_timeline(self, device_id: str = None, hours: int = 24) -> List[Dict]:
+        columns = self._load(hours)
+        mask = self._device_mask(columns, device_id)
+        if mask is not None:
+            columns = {name: values[mask] for name, values in columns.items()}
+
+        order = np.argsort(columns['epoch'], kind="stable")
+        if not device_id:
+            order = order[:100]
+
+        epochs = columns['epoch'][order]
+        power = columns['power'][order].astype(np.float64)
+        energy_wh = power * columns['duration'][order] / 3600
+        colors = columns['color'][order]
+        devices = columns['device'][order]
+
+        timeline = []
+        for i in range(len(order)):
+            row = {
+                'time': datetime.fromtimestamp(int(epochs[i])).strftime('%Y-%m-%dT%H:%M:%S'),
+                'energy_wh': _round_float32(energy_wh[i]),
+                'power_watts': _round_float32(power[i]),
+                'color': self.colors.values[colors[i]],
+            }
+            if not device_id:
+                row['device_id'] = self.devices.values[devices[i]]
+            timeline.append(row)
+        return timeline
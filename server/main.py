@@ -1,3 +1,4 @@
+import os
 import socket
 import speech_recognition as sr
 import pyaudio
@@ -9,13 +10,23 @@ from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
 from fastapi.responses import FileResponse
 from pydantic import BaseModel
-from typing import List, Optional
+from typing import Dict, List, Optional
 import uvicorn
 from datetime import datetime
 
 # Import updated helper files
 from database import Database
+from connection_manager import ConnectionManager
+from serialization import EncodedBodyCache, FastJSONResponse
 from energy_simulator import EnergySimulator
+from energy_projection import project_energy
+from voice_commands import parse_voice_command
+from audio_ingest import AudioBufferManager, udp_audio_loop
+from audio_workers import AudioWorkerPool
+from command_scheduler import CommandScheduler
+from recognizers import FakeStreamingRecognizer, GoogleRecognizer, RecordingRecognizer
+from streaming_recognition import RecognitionStats, StreamingUtteranceTracker
+from udp_capture import CaptureWriter
 
 # --- Configuration ---
 UDP_IP = "0.0.0.0"
@@ -32,11 +43,43 @@ AUDIO_BYTES_PER_SECOND = SAMPLE_RATE * SAMPLE_WIDTH * CHANNELS
 TARGET_BUFFER_SIZE = int(AUDIO_BYTES_PER_SECOND * BUFFER_DURATION_SECONDS)
 PACKET_TIMEOUT_SECONDS = 1.0
 
+# --- Recognition Configuration ---
+# "buffered" recognizes each complete buffer once. "streaming" feeds packets to
+# the recognizer as they arrive and dispatches on the first unambiguous partial.
+RECOGNITION_MODE = os.environ.get("RECOGNITION_MODE", "buffered")
+# "google" or "fake" (scripted transcripts, for tests and traffic replays)
+RECOGNIZER = os.environ.get("RECOGNIZER", "google")
+FAKE_TRANSCRIPTS_PATH = os.environ.get("FAKE_TRANSCRIPTS_PATH", "fake_transcripts.jsonl")
+
+# --- Traffic Capture Configuration ---
+# When set, both UDP listeners append every datagram to this file (audio
+# workers to "<path>.worker<N>") and recognized transcripts go next to it as
+# "<path>.transcripts.jsonl", for replay_capture.py.
+UDP_CAPTURE_PATH = os.environ.get("UDP_CAPTURE_PATH", "")
+
+# --- Energy Storage Configuration ---
+# "sqlite" (energy_logs table) or "columnar" (mmap'd per-day segments, needs numpy).
+# A new columnar store is backfilled from energy_logs on first start; logs
+# written while columnar is active are not copied back to SQLite.
+ENERGY_BACKEND = os.environ.get("ENERGY_BACKEND", "sqlite")
+# Projection arrays grow with devices x hours; one leap year at most
+MAX_PROJECTION_HOURS = 24 * 366
+
+# --- Outbound Command Configuration ---
+COMMAND_MIN_INTERVAL_SECONDS = 0.05
+COMMAND_ACK_TIMEOUT_SECONDS = 0.5
+COMMAND_MAX_RETRIES = 3
+
+# --- Sharded Ingest Configuration ---
+# 0 keeps the single in-process listener thread. N > 0 starts N worker
+# processes that share UDP_AUDIO_PORT through SO_REUSEPORT (Linux/BSD only).
+AUDIO_WORKERS = int(os.environ.get("AUDIO_WORKERS", "0"))
+
 # --- Global State ---
-client_buffers = {}
-db = Database()
+db = Database(energy_backend=ENERGY_BACKEND)
 energy_sim = EnergySimulator()
-app = FastAPI(title="Voice Home Automation API")
+app = FastAPI(title="Voice Home Automation API", default_response_class=FastJSONResponse)
+response_cache = EncodedBodyCache()
 
 # --- CORS Middleware ---
 app.add_middleware(
@@ -48,27 +91,10 @@ app.add_middleware(
 )
 
 # --- WebSocket Manager ---
-class ConnectionManager:
-    def __init__(self):
-        self.active_connections: List[WebSocket] = []
-
-    async def connect(self, websocket: WebSocket):
-        await websocket.accept()
-        self.active_connections.append(websocket)
-        print(f"[WEBSOCKET] New connection. Total: {len(self.active_connections)}")
-
-    def disconnect(self, websocket: WebSocket):
-        self.active_connections.remove(websocket)
-        print(f"[WEBSOCKET] Connection closed. Total: {len(self.active_connections)}")
-
-    async def broadcast(self, message: dict):
-        for connection in self.active_connections:
-            try:
-                await connection.send_json(message)
-            except:
-                pass
-
 manager = ConnectionManager()
+audio_pool: Optional[AudioWorkerPool] = None
+# uvicorn's event loop; the WebSockets belong to it, so threads broadcast through it
+server_loop: Optional[asyncio.AbstractEventLoop] = None
 
 # --- Pydantic Models ---
 class ControlCommand(BaseModel):
@@ -76,6 +102,19 @@ class ControlCommand(BaseModel):
     led_id: str  # "LED1", "LED2", or "ALL"
     color: str
 
+class DeviceSchedule(BaseModel):
+    # One column per event field; plain lists validate far faster than a model per event
+    times: List[float]  # seconds after the projection start
+    led_ids: List[str]  # "LED1", "LED2", or "ALL"
+    colors: List[str]
+
+class ProjectionRequest(BaseModel):
+    hours: int = 24
+    schedules: Dict[str, DeviceSchedule]
+    power_map_led1: Optional[Dict[str, float]] = None
+    power_map_led2: Optional[Dict[str, float]] = None
+    include_device_hourly: bool = False
+
 class DeviceStatus(BaseModel):
     device_id: str
     ip_address: str
@@ -85,21 +124,58 @@ class DeviceStatus(BaseModel):
     current_color_led2: Optional[str]
 
 # --- PyAudio & Recognizer ---
-p = pyaudio.PyAudio()
-stream = p.open(format=p.get_format_from_width(SAMPLE_WIDTH),
-                channels=CHANNELS,
-                rate=SAMPLE_RATE,
-                output=True)
 r = sr.Recognizer()
 
-# --- UDP Sockets ---
-sock_audio = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
-sock_audio.bind((UDP_IP, UDP_AUDIO_PORT))
-sock_audio.setblocking(0)
-
-sock_control = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
-sock_control.bind((UDP_IP, UDP_CONTROL_PORT))
-sock_control.setblocking(0)
+if RECOGNIZER == "fake":
+    base_recognizer = FakeStreamingRecognizer.from_file(FAKE_TRANSCRIPTS_PATH)
+else:
+    base_recognizer = GoogleRecognizer(r, SAMPLE_RATE, SAMPLE_WIDTH)
+recognizer = base_recognizer
+recognition_stats = RecognitionStats()
+
+# --- UDP Sockets, Playback & Capture ---
+# Opened in startup_event rather than on import: sharded audio workers start
+# from a fresh interpreter that re-imports this module, and must not bind the
+# ports, open the audio device or the capture file of the API process.
+stream = None
+udp_capture: Optional[CaptureWriter] = None
+sock_audio: Optional[socket.socket] = None
+sock_control: Optional[socket.socket] = None
+command_scheduler: Optional[CommandScheduler] = None
+
+def open_playback_stream():
+    global stream
+    p = pyaudio.PyAudio()
+    stream = p.open(format=p.get_format_from_width(SAMPLE_WIDTH),
+                    channels=CHANNELS,
+                    rate=SAMPLE_RATE,
+                    output=True)
+
+def open_udp_sockets():
+    """Binds the UDP ports and creates the outbound command scheduler"""
+    global udp_capture, recognizer, sock_audio, sock_control, command_scheduler
+
+    if UDP_CAPTURE_PATH:
+        udp_capture = CaptureWriter(UDP_CAPTURE_PATH)
+        recognizer = RecordingRecognizer(base_recognizer, f"{UDP_CAPTURE_PATH}.transcripts.jsonl")
+
+    # In sharded mode the workers bind the audio port themselves
+    if AUDIO_WORKERS == 0:
+        sock_audio = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        sock_audio.bind((UDP_IP, UDP_AUDIO_PORT))
+        sock_audio.setblocking(0)
+
+    sock_control = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    sock_control.bind((UDP_IP, UDP_CONTROL_PORT))
+    sock_control.setblocking(0)
+
+    command_scheduler = CommandScheduler(
+        sock_control,
+        UDP_CONTROL_PORT,
+        min_interval_seconds=COMMAND_MIN_INTERVAL_SECONDS,
+        ack_timeout_seconds=COMMAND_ACK_TIMEOUT_SECONDS,
+        max_retries=COMMAND_MAX_RETRIES,
+    )
 
 # --- Helper Functions ---
 def play_audio_in_background(audio_data):
@@ -118,184 +194,205 @@ async def broadcast_update(update_type: str, data: dict):
     }
     await manager.broadcast(message)
 
-# --- FIXED: process_audio_buffer ---
-def process_audio_buffer(audio_data_bytes, client_address):
-    """Processes audio and handles correct ON/OFF logic for LED 1"""
-    print(f"\n[PROCESS] Processing {len(audio_data_bytes)} bytes for {client_address}...")
-    
+def broadcast_from_thread(update_type: str, data: dict):
+    """Schedules a broadcast on the server event loop from a background thread"""
+    if server_loop is None:
+        return
+    asyncio.run_coroutine_threadsafe(broadcast_update(update_type, data), server_loop)
+
+def register_audio_client(client_address):
     device_id = get_device_id_from_address(client_address)
     db.upsert_device(device_id, client_address[0])
-    
+
+def record_led_state(device_id: str, led_id: str, color: str):
+    """Stores the new LED color and logs the energy used by the previous one"""
+    db.update_device_color(device_id, led_id, color)
+    energy_logs = energy_sim.update_device_state(device_id, led_id, color)
+    for log in energy_logs:
+        db.add_energy_log(log['device_id'], log['power_watts'], log['duration_seconds'], log['color'])
+
+def schedule_command(device_id: str, ip_address: str, command_str: str, command_text: str,
+                     color_led1: Optional[str], color_led2: Optional[str]):
+    """
+    Queues a command for the board. State, energy and history are only
+    recorded once the scheduler actually sends it, so commands superseded
+    while still queued never reach the DB. A command the board never confirms
+    is marked unsuccessful in the history; the LED columns are corrected by
+    its next STATUS heartbeat.
+    """
+    history = {}
+
+    def on_dispatch(sent_command_str: str, expected: Dict[str, str]):
+        # A newer single-LED command may have taken one LED away from an ALL;
+        # only record what was actually sent
+        sent_color_led1 = color_led1 if "LED1" in expected else None
+        sent_color_led2 = color_led2 if "LED2" in expected else None
+
+        if sent_color_led1:
+            record_led_state(device_id, "LED1", sent_color_led1)
+
+        if sent_color_led2:
+            record_led_state(device_id, "LED2", sent_color_led2)
+
+        # Marked failed by on_failed if the board never confirms it
+        history['command_id'] = db.add_command(command_text, sent_command_str, device_id, True)
+
+        broadcast_from_thread("command_executed", {
+            "device_id": device_id,
+            "command_text": command_text,
+            "led_id": sent_command_str.partition("_")[0],
+            "color_led1": sent_color_led1,
+            "color_led2": sent_color_led2,
+            "success": True
+        })
+
+    def on_failed(sent_command_str: str, expected: Dict[str, str]):
+        if 'command_id' in history:
+            db.set_command_success(history['command_id'], False)
+
+        broadcast_from_thread("command_failed", {
+            "device_id": device_id,
+            "command_text": command_text,
+            "reason": "No confirmation from device"
+        })
+
+    command_scheduler.submit(device_id, ip_address, command_str, on_dispatch=on_dispatch, on_failed=on_failed)
+
+def recognize_audio(audio_data_bytes, client_address) -> Optional[str]:
+    """Runs one-shot speech recognition on raw PCM audio, returns None if nothing was understood"""
+    session = recognizer.start(client_address)
+    session.feed(audio_data_bytes)
+    return session.finish()
+
+def execute_voice_command(text: str, command: Optional[dict], client_address):
+    """Queues a parsed voice command for the board"""
+    device_id = get_device_id_from_address(client_address)
+
+    if command:
+        print(f"[ACTION] Queued '{command['command_str']}' command for {client_address[0]}")
+        schedule_command(device_id, client_address[0], command["command_str"], text,
+                         command["color_led1"], command["color_led2"])
+
+    else:
+        print("[INFO] No command recognized in the text.")
+        broadcast_from_thread("command_failed", {
+            "device_id": device_id,
+            "command_text": text,
+            "reason": "No valid command found"
+        })
+
+def process_audio_buffer(audio_data_bytes, client_address):
+    """Registers the board, plays the buffer back and queues the recognized command"""
+    print(f"\n[PROCESS] Processing {len(audio_data_bytes)} bytes for {client_address}...")
+
+    register_audio_client(client_address)
+
     playback_thread = threading.Thread(target=play_audio_in_background, args=(audio_data_bytes,))
     playback_thread.start()
 
-    try:
-        audio_data = sr.AudioData(audio_data_bytes, SAMPLE_RATE, SAMPLE_WIDTH)
-        print("[PROCESS] Sending to Google for recognition...")
-        text = r.recognize_google(audio_data)
-        print(f"[SUCCESS] Recognized Text: '{text}'")
-
-        # --- Normalize text to fix "one"/"two"/"to" ambiguity ---
-        text_normalized = text.lower()
-        text_normalized = text_normalized.replace(" light one", " light 1")
-        text_normalized = text_normalized.replace(" led one", " led 1")
-        text_normalized = text_normalized.replace(" light two", " light 2")
-        text_normalized = text_normalized.replace(" led two", " led 2")
-        text_normalized = text_normalized.replace(" light to", " light 2")
-        text_normalized = text_normalized.replace(" led to", " led 2")
-
-        words = text_normalized.split()
-        
-        command_to_send = None
-        color_command_part = None 
-        led_id = "ALL"
-        led_command_part = "ALL_"
-
-        # --- Detect LED ID by looking for "one", "two", "to", "1", "2" in the words ---
-        if "one" in words or "1" in words:
-            led_id = "LED1"
-            led_command_part = "LED1_"
-        elif "two" in words or "to" in words or "2" in words:
-            led_id = "LED2"
-            led_command_part = "LED2_"
-        elif "all" in words or "both" in words:
-            led_id = "ALL"
-            led_command_part = "ALL_"
-
-        # --- Find color/action from normalized text and words ---
-        if "off" in words:
-            color_command_part = "OFF"
-        elif "on" in words:
-            color_command_part = "ON"
-        elif "red" in words:
-            color_command_part = "RED"
-        elif "green" in words:
-            color_command_part = "GREEN"
-        elif "blue" in words:
-            color_command_part = "BLUE"
-        elif "white" in words:
-            color_command_part = "WHITE"
-        elif "purple" in words:
-            color_command_part = "PURPLE"
-        elif "yellow" in words:
-            color_command_part = "YELLOW"
-        
-        if color_command_part:
-            # Determine the actual command to send to ESP32 and logical state for DB/Energy Sim
-            color_for_led1_logic = None
-            color_for_led2_logic = None
-            color_for_esp = color_command_part
-
-            if led_id == "LED1":
-                # LED1 supports full RGB colors
-                color_for_led1_logic = color_command_part
-                color_for_esp = color_command_part
-            elif led_id == "LED2":
-                # LED2 only supports ON/OFF
-                if color_command_part == "OFF":
-                    color_for_esp = "OFF"
-                    color_for_led2_logic = "OFF"
-                else:
-                    color_for_esp = "ON"
-                    color_for_led2_logic = "ON"
-            elif led_id == "ALL":
-                # For ALL: LED1 gets the color, LED2 gets ON/OFF
-                if color_command_part == "OFF":
-                    color_for_led1_logic = "OFF"
-                    color_for_led2_logic = "OFF"
-                    color_for_esp = "OFF"
-                elif color_command_part == "ON":
-                    color_for_led1_logic = "WHITE"
-                    color_for_led2_logic = "ON"
-                    color_for_esp = "WHITE"
-                else:
-                    color_for_led1_logic = color_command_part
-                    color_for_led2_logic = "ON"
-                    color_for_esp = color_command_part
-            
-            command_str = f"{led_command_part}{color_for_esp}"
-            command_to_send = command_str.encode('utf-8')
+    text = recognize_audio(audio_data_bytes, client_address)
+    if text is not None:
+        execute_voice_command(text, parse_voice_command(text), client_address)
+
+def create_audio_buffers(on_buffer, on_new_client, on_command=None, on_utterance_done=None) -> AudioBufferManager:
+    """
+    Buffers for one listener. In streaming mode packets also go straight to
+    the recognizer and `on_command` fires as soon as an intent is recognized;
+    `on_buffer` then only marks the end of the utterance.
+    """
+    if RECOGNITION_MODE != "streaming":
+        return AudioBufferManager(
+            TARGET_BUFFER_SIZE,
+            PACKET_TIMEOUT_SECONDS,
+            AUDIO_BYTES_PER_SECOND * 0.5,
+            on_buffer=on_buffer,
+            on_new_client=on_new_client,
+        )
+
+    tracker = StreamingUtteranceTracker(recognizer, on_command, on_utterance_done)
+
+    def on_utterance_end(audio_data_bytes, client_address):
+        on_buffer(audio_data_bytes, client_address)
+        tracker.finish(client_address)
+
+    return AudioBufferManager(
+        TARGET_BUFFER_SIZE,
+        PACKET_TIMEOUT_SECONDS,
+        AUDIO_BYTES_PER_SECOND * 0.5,
+        on_buffer=on_utterance_end,
+        on_new_client=on_new_client,
+        on_packet=tracker.feed,
+        on_discard=tracker.discard,
+    )
+
+def play_streamed_utterance(audio_data_bytes, client_address):
+    playback_thread = threading.Thread(target=play_audio_in_background, args=(audio_data_bytes,))
+    playback_thread.start()
 
-            # Send command to ESP32
-            control_addr = (client_address[0], UDP_CONTROL_PORT)
-            sock_control.sendto(command_to_send, control_addr)
-            print(f"[ACTION] Sent '{command_str}' command to {control_addr}")
-            
-            # Update DB and Energy Sim
-            if color_for_led1_logic:
-                db.update_device_color(device_id, "LED1", color_for_led1_logic)
-                energy_logs_1 = energy_sim.update_device_state(device_id, "LED1", color_for_led1_logic)
-                for log in energy_logs_1:
-                    db.add_energy_log(log['device_id'], log['power_watts'], log['duration_seconds'], log['color'])
-
-            if color_for_led2_logic:
-                db.update_device_color(device_id, "LED2", color_for_led2_logic)
-                energy_logs_2 = energy_sim.update_device_state(device_id, "LED2", color_for_led2_logic)
-                for log in energy_logs_2:
-                    db.add_energy_log(log['device_id'], log['power_watts'], log['duration_seconds'], log['color'])
-            
-            db.add_command(text, command_str, device_id, True)
-            
-            asyncio.run(broadcast_update("command_executed", {
-                "device_id": device_id,
-                "command_text": text,
-                "led_id": led_id,
-                "color_led1": color_for_led1_logic,
-                "color_led2": color_for_led2_logic,
-                "success": True
-            }))
-            
-        else:
-            print("[INFO] No command recognized in the text.")
-            asyncio.run(broadcast_update("command_failed", {
-                "device_id": device_id,
-                "command_text": text,
-                "reason": "No valid command found"
-            }))
-
-    except sr.UnknownValueError:
-        print("[ERROR] Google could not understand the audio.")
-    except sr.RequestError as e:
-        print(f"[ERROR] Could not request results from Google; {e}")
+def handle_recognized_command(text: str, command: Optional[dict], client_address):
+    register_audio_client(client_address)
+    execute_voice_command(text, command, client_address)
 
 # --- UDP Audio Thread ---
 def udp_audio_listener():
     """Main UDP listener loop for AUDIO (runs in separate thread)"""
     print("[UDP_AUDIO] Audio listener thread started")
     print(f"[UDP_AUDIO] Listening on port {UDP_AUDIO_PORT}")
-    
-    while True:
-        try:
-            data, addr = sock_audio.recvfrom(2048)
-            
-            if addr not in client_buffers:
-                client_buffers[addr] = {'buffer': b'', 'last_packet_time': time.time()}
-                device_id = get_device_id_from_address(addr)
-                db.upsert_device(device_id, addr[0])
-                print(f"[INFO] New client connected: {addr}. Creating buffer.")
-                
-            client_buffers[addr]['buffer'] += data
-            client_buffers[addr]['last_packet_time'] = time.time()
-            
-            if len(client_buffers[addr]['buffer']) >= TARGET_BUFFER_SIZE:
-                print(f"[INFO] Client {addr} buffer reached target size. Processing...")
-                process_audio_buffer(client_buffers[addr]['buffer'], addr)
-                client_buffers[addr]['buffer'] = b''
-                
-        except BlockingIOError:
-            pass
 
-        for addr in list(client_buffers.keys()):
-            time_since_last_packet = time.time() - client_buffers[addr]['last_packet_time']
-            if time_since_last_packet > PACKET_TIMEOUT_SECONDS:
-                if len(client_buffers[addr]['buffer']) > AUDIO_BYTES_PER_SECOND * 0.5:
-                    print(f"[INFO] Client {addr} timed out. Processing collected audio...")
-                    process_audio_buffer(client_buffers[addr]['buffer'], addr)
-                else:
-                    print(f"[INFO] Client {addr} timed out with insufficient audio. Discarding buffer.")
-                del client_buffers[addr]
-                
-        time.sleep(0.01)
+    if RECOGNITION_MODE == "streaming":
+        buffers = create_audio_buffers(play_streamed_utterance, register_audio_client,
+                                       handle_recognized_command, recognition_stats.record)
+    else:
+        buffers = create_audio_buffers(process_audio_buffer, register_audio_client)
+    udp_audio_loop(sock_audio, buffers, capture=udp_capture)
+
+# --- Sharded Audio Workers ---
+def audio_worker(worker_index: int, sock, emit):
+    """
+    Runs inside an audio worker process. Recognizes audio for the boards the
+    kernel routed to this worker and forwards the results to the API process.
+    Local playback is only done by the single-process listener.
+    """
+    global recognizer
+    capture = None
+    if UDP_CAPTURE_PATH:
+        # Each worker records its own share of the traffic
+        capture_path = f"{UDP_CAPTURE_PATH}.worker{worker_index}"
+        capture = CaptureWriter(capture_path)
+        recognizer = RecordingRecognizer(base_recognizer, f"{capture_path}.transcripts.jsonl")
+
+    def on_buffer(audio_data_bytes, client_address):
+        print(f"\n[WORKER {worker_index}] Processing {len(audio_data_bytes)} bytes for {client_address}...")
+        text = recognize_audio(audio_data_bytes, client_address)
+        if text is not None:
+            emit(("voice_command", client_address, text, parse_voice_command(text)))
+
+    def on_new_client(client_address):
+        emit(("client_connected", client_address))
+
+    def on_command(text, command, client_address):
+        emit(("voice_command", client_address, text, command))
+
+    def on_utterance_done(summary):
+        emit(("utterance_done", summary))
+
+    if RECOGNITION_MODE == "streaming":
+        buffers = create_audio_buffers(lambda audio_data_bytes, client_address: None, on_new_client,
+                                       on_command, on_utterance_done)
+    else:
+        buffers = create_audio_buffers(on_buffer, on_new_client)
+    udp_audio_loop(sock, buffers, capture=capture)
+
+def handle_worker_event(event):
+    """Applies an event forwarded by an audio worker (runs in the API process)"""
+    kind = event[0]
+    if kind == "client_connected":
+        register_audio_client(event[1])
+    elif kind == "voice_command":
+        _, client_address, text, command = event
+        handle_recognized_command(text, command, client_address)
+    elif kind == "utterance_done":
+        recognition_stats.record(event[1])
 
 # --- UDP Status Thread ---
 def udp_status_listener():
@@ -306,6 +403,8 @@ def udp_status_listener():
     while True:
         try:
             data, addr = sock_control.recvfrom(128)
+            if udp_capture:
+                udp_capture.record(UDP_CONTROL_PORT, addr, data)
             message = data.decode('utf-8')
             
             if message.startswith("STATUS:"):
@@ -325,14 +424,16 @@ def udp_status_listener():
 
                 print(f"[STATUS] Received from {device_id}: LED1={color_led1}, LED2={color_led2}")
                 
+                command_scheduler.confirm(device_id, color_led1, color_led2)
+                
                 db.update_device_color(device_id, "LED1", color_led1)
                 db.update_device_color(device_id, "LED2", color_led2)
                 
-                asyncio.run(broadcast_update("status_update", {
+                broadcast_from_thread("status_update", {
                     "device_id": device_id,
                     "color_led1": color_led1,
                     "color_led2": color_led2
-                }))
+                })
             
         except BlockingIOError:
             pass
@@ -345,8 +446,9 @@ def udp_status_listener():
 
 @app.get("/api/devices")
 async def get_devices():
-    devices = db.get_all_devices()
-    return {"devices": devices}
+    # Encoded body is reused until a device row changes
+    return response_cache.response("devices", db.table_versions['devices'],
+                                   lambda: {"devices": db.get_all_devices()})
 
 @app.get("/api/devices/{device_id}")
 async def get_device(device_id: str):
@@ -390,16 +492,12 @@ async def control_device(command: ControlCommand):
              return {"success": False, "error": f"Invalid color. Must be one of {valid_colors_rgb}"}
 
     command_str = f"{led_id_upper}_{color_for_esp}"
-    command_bytes = command_str.encode('utf-8')
     
     if 'ip_address' not in device:
          return {"success": False, "error": "Device IP not found in database."}
     
     ip_address = device['ip_address'].replace('esp32_', '').replace('_', '.')
     
-    control_addr = (ip_address, UDP_CONTROL_PORT)
-    sock_control.sendto(command_bytes, control_addr)
-    
     color_for_led1_logic = None
     color_for_led2_logic = None
 
@@ -414,45 +512,68 @@ async def control_device(command: ControlCommand):
         color_for_led1_logic = color_upper
         color_for_led2_logic = "ON" if color_upper != "OFF" else "OFF"
 
-    if color_for_led1_logic:
-        db.update_device_color(command.device_id, "LED1", color_for_led1_logic)
-        energy_logs_1 = energy_sim.update_device_state(command.device_id, "LED1", color_for_led1_logic)
-        for log in energy_logs_1:
-            db.add_energy_log(log['device_id'], log['power_watts'], log['duration_seconds'], log['color'])
-
-    if color_for_led2_logic:
-        db.update_device_color(command.device_id, "LED2", color_for_led2_logic)
-        energy_logs_2 = energy_sim.update_device_state(command.device_id, "LED2", color_for_led2_logic)
-        for log in energy_logs_2:
-            db.add_energy_log(log['device_id'], log['power_watts'], log['duration_seconds'], log['color'])
-    
-    db.add_command(f"Manual: {command_str}", command_bytes.decode(), command.device_id, True)
-    
-    await broadcast_update("command_executed", {
-        "device_id": command.device_id,
-        "command_text": f"Manual: {command_str}",
-        "led_id": led_id_upper,
-        "color_led1": color_for_led1_logic,
-        "color_led2": color_for_led2_logic,
-        "success": True
-    })
+    schedule_command(command.device_id, ip_address, command_str, f"Manual: {command_str}",
+                     color_for_led1_logic, color_for_led2_logic)
     
-    return {"success": True, "device_id": command.device_id, "led_id": led_id_upper, "color": color_upper}
+    return {"success": True, "queued": True, "device_id": command.device_id, "led_id": led_id_upper, "color": color_upper}
 
 @app.get("/api/commands")
 async def get_commands(limit: int = 50):
-    commands = db.get_recent_commands(limit)
-    return {"commands": commands}
+    return response_cache.response(("commands", limit), db.table_versions['commands'],
+                                   lambda: {"commands": db.get_recent_commands(limit)})
 
+@app.get("/api/commands/delivery")
+async def get_command_delivery_stats():
+    return command_scheduler.get_stats()
+
+@app.get("/api/recognition/stats")
+async def get_recognition_stats():
+    return {"mode": RECOGNITION_MODE, **recognition_stats.get_stats()}
+
+# Sync handlers run in the threadpool, so concurrent dashboards that miss the
+# query cache wait on one computation instead of blocking the event loop.
 @app.get("/api/energy/stats")
-async def get_energy_stats(device_id: Optional[str] = None, hours: int = 24):
+def get_energy_stats(device_id: Optional[str] = None, hours: int = 24):
     stats = db.get_energy_stats(device_id, hours)
-    return stats
+    return FastJSONResponse(stats)
 
 @app.get("/api/energy/timeline")
-async def get_energy_timeline(device_id: Optional[str] = None, hours: int = 24):
+def get_energy_timeline(device_id: Optional[str] = None, hours: int = 24):
     timeline = db.get_energy_timeline(device_id, hours)
-    return {"timeline": timeline}
+    return FastJSONResponse({"timeline": timeline})
+
+@app.post("/api/energy/projection")
+def project_energy_schedule(request: ProjectionRequest):
+    """
+    What-if energy for per-device LED schedules, per device and per hour.
+    `compute_ms` covers the projection itself, not parsing the request.
+    """
+    start = time.perf_counter()
+    if not 1 <= request.hours <= MAX_PROJECTION_HOURS:
+        return {"success": False, "error": f"hours must be between 1 and {MAX_PROJECTION_HOURS}"}
+
+    schedules = {
+        device_id: (schedule.times, schedule.led_ids, schedule.colors)
+        for device_id, schedule in request.schedules.items()
+    }
+    try:
+        projection = project_energy(schedules, request.hours,
+                                    request.power_map_led1, request.power_map_led2)
+    except ValueError as e:
+        return {"success": False, "error": str(e)}
+
+    result = {
+        "success": True,
+        "hours": request.hours,
+        "total_energy_wh": float(projection['hourly_wh'].sum()),
+        "hourly_energy_wh": projection['hourly_wh'].tolist(),
+        "device_energy_wh": dict(zip(projection['device_ids'], projection['device_total_wh'].tolist())),
+    }
+    if request.include_device_hourly:
+        result["device_hourly_energy_wh"] = dict(zip(projection['device_ids'],
+                                                     projection['device_hourly_wh'].tolist()))
+    result["compute_ms"] = (time.perf_counter() - start) * 1000
+    return FastJSONResponse(result)
 
 @app.websocket("/ws")
 async def websocket_endpoint(websocket: WebSocket):
@@ -476,10 +597,23 @@ async def startup_event():
     print(f"API Docs: http://localhost:{HTTP_PORT}/docs")
     print(f"UDP Audio Port: {UDP_AUDIO_PORT}")
     print(f"UDP Control Port: {UDP_CONTROL_PORT}")
+    print(f"Audio Workers: {AUDIO_WORKERS or 'in-process'}")
+    print(f"Recognition: {RECOGNITION_MODE} ({RECOGNIZER})")
     print("="*50)
     
-    udp_audio_thread = threading.Thread(target=udp_audio_listener, daemon=True)
-    udp_audio_thread.start()
+    global server_loop
+    server_loop = asyncio.get_running_loop()
+    open_udp_sockets()
+    command_scheduler.start()
+    
+    if AUDIO_WORKERS > 0:
+        global audio_pool
+        audio_pool = AudioWorkerPool(AUDIO_WORKERS, UDP_IP, UDP_AUDIO_PORT, audio_worker, handle_worker_event)
+        audio_pool.start()
+    else:
+        open_playback_stream()
+        udp_audio_thread = threading.Thread(target=udp_audio_listener, daemon=True)
+        udp_audio_thread.start()
     
     udp_status_thread = threading.Thread(target=udp_status_listener, daemon=True)
     udp_status_thread.start()
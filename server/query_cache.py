@@ -0,0 +1,82 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional
+
+
+class QueryCache:
+    """
+    LRU cache for energy query results.
+
+    Entries are keyed on (endpoint, device_id, hours, bucket) where `bucket`
+    is the current `ttl_seconds` time slice, so sliding-window results are
+    recomputed at least once per TTL. Each entry also remembers the
+    generation of the data it was computed from; `invalidate()` bumps the
+    device's generation (and the fleet-wide one used by unfiltered queries).
+    Concurrent misses on the same key wait for a single computation.
+    """
+
+    def __init__(self, max_entries: int = 256, ttl_seconds: float = 5.0,
+                 clock: Callable[[], float] = time.time):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.clock = clock
+
+        self._entries: "OrderedDict[tuple, Dict]" = OrderedDict()
+        self._inflight: Dict[tuple, threading.Event] = {}
+        self._generations: Dict[str, int] = {}
+        self._global_generation = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _generation(self, device_id: Optional[str]) -> int:
+        if device_id:
+            return self._generations.get(device_id, 0)
+        return self._global_generation
+
+    def invalidate(self, device_id: Optional[str]):
+        with self._lock:
+            if device_id:
+                self._generations[device_id] = self._generations.get(device_id, 0) + 1
+            self._global_generation += 1
+
+    def get_or_compute(self, endpoint: str, device_id: Optional[str], hours: int,
+                       compute: Callable[[], Any]) -> Any:
+        key = (endpoint, device_id, hours, int(self.clock() // self.ttl_seconds))
+
+        while True:
+            with self._lock:
+                generation = self._generation(device_id)
+                entry = self._entries.get(key)
+                if entry is not None and entry['generation'] == generation:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return entry['value']
+
+                event = self._inflight.get(key)
+                if event is None:
+                    event = threading.Event()
+                    self._inflight[key] = event
+                    self.misses += 1
+                    break
+
+            # Someone else is computing this key; reuse their result
+            event.wait()
+
+        try:
+            value = compute()
+            with self._lock:
+                self._entries[key] = {'value': value, 'generation': generation}
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+            return value
+        finally:
+            with self._lock:
+                del self._inflight[key]
+            event.set()
+
+    def get_stats(self) -> Dict:
+        with self._lock:
+            return {'entries': len(self._entries), 'hits': self.hits, 'misses': self.misses}
@@ -0,0 +1,183 @@
+import json
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import defaultdict, deque
+from typing import Dict, List, Optional, Tuple
+
+import speech_recognition as sr
+
+Address = Tuple[str, int]
+
+
+class RecognitionSession(ABC):
+    """One utterance being recognized. Audio is fed in chunks as it arrives."""
+
+    @abstractmethod
+    def feed(self, chunk: bytes) -> Optional[str]:
+        """Add audio; returns the current partial hypothesis if it changed"""
+
+    @abstractmethod
+    def finish(self) -> Optional[str]:
+        """End of utterance; returns the final transcript or None"""
+
+    @abstractmethod
+    def cancel(self):
+        """Stop recognizing the rest of the utterance"""
+
+
+class Recognizer(ABC):
+    """Creates a recognition session per utterance"""
+
+    streaming = False
+
+    @abstractmethod
+    def start(self, client_address: Address) -> RecognitionSession:
+        """Begin recognizing a new utterance from `client_address`"""
+
+
+class _GoogleSession(RecognitionSession):
+    def __init__(self, recognizer, sample_rate: int, sample_width: int):
+        self.recognizer = recognizer
+        self.sample_rate = sample_rate
+        self.sample_width = sample_width
+        self.audio = bytearray()
+
+    def feed(self, chunk: bytes) -> Optional[str]:
+        self.audio += chunk
+        return None
+
+    def finish(self) -> Optional[str]:
+        try:
+            audio_data = sr.AudioData(bytes(self.audio), self.sample_rate, self.sample_width)
+            print("[PROCESS] Sending to Google for recognition...")
+            text = self.recognizer.recognize_google(audio_data)
+            print(f"[SUCCESS] Recognized Text: '{text}'")
+            return text
+        except sr.UnknownValueError:
+            print("[ERROR] Google could not understand the audio.")
+        except sr.RequestError as e:
+            print(f"[ERROR] Could not request results from Google; {e}")
+        return None
+
+    def cancel(self):
+        self.audio = bytearray()
+
+
+class GoogleRecognizer(Recognizer):
+    """
+    Google Web Speech through SpeechRecognition. The API is one-shot, so it
+    never produces partial hypotheses and only answers in `finish()`.
+    """
+
+    def __init__(self, recognizer, sample_rate: int, sample_width: int):
+        self.recognizer = recognizer
+        self.sample_rate = sample_rate
+        self.sample_width = sample_width
+
+    def start(self, client_address: Address) -> RecognitionSession:
+        return _GoogleSession(self.recognizer, self.sample_rate, self.sample_width)
+
+
+class _FakeSession(RecognitionSession):
+    def __init__(self, text: Optional[str], bytes_per_word: int):
+        self.words = text.split() if text else []
+        self.bytes_per_word = bytes_per_word
+        self.bytes_fed = 0
+        self.words_emitted = 0
+        self.cancelled = False
+
+    def feed(self, chunk: bytes) -> Optional[str]:
+        if self.cancelled:
+            return None
+        self.bytes_fed += len(chunk)
+        words_heard = min(len(self.words), self.bytes_fed // self.bytes_per_word)
+        if words_heard == self.words_emitted:
+            return None
+        self.words_emitted = words_heard
+        return " ".join(self.words[:words_heard])
+
+    def finish(self) -> Optional[str]:
+        if self.cancelled or not self.words:
+            return None
+        return " ".join(self.words)
+
+    def cancel(self):
+        self.cancelled = True
+
+
+class FakeStreamingRecognizer(Recognizer):
+    """
+    Scripted recognizer for tests and replays. Each new utterance from a board
+    takes the next transcript queued for its IP (or the shared "*" queue) and
+    reveals one more word every `bytes_per_word` bytes of audio.
+    """
+
+    streaming = True
+
+    def __init__(self, transcripts: Dict[str, List[str]], bytes_per_word: int = 8000):
+        self.transcripts = defaultdict(deque, {ip: deque(texts) for ip, texts in transcripts.items()})
+        self.bytes_per_word = bytes_per_word
+
+    @classmethod
+    def from_file(cls, path: str, bytes_per_word: int = 8000) -> "FakeStreamingRecognizer":
+        """Load a JSON lines file of {"source": ip, "text": transcript} records"""
+        transcripts: Dict[str, List[str]] = defaultdict(list)
+        with open(path) as f:
+            for line in f:
+                if line.strip():
+                    record = json.loads(line)
+                    transcripts[record.get("source", "*")].append(record["text"])
+        return cls(transcripts, bytes_per_word)
+
+    def start(self, client_address: Address) -> RecognitionSession:
+        queue = self.transcripts[client_address[0]] or self.transcripts["*"]
+        text = queue.popleft() if queue else None
+        return _FakeSession(text, self.bytes_per_word)
+
+
+class _RecordingSession(RecognitionSession):
+    def __init__(self, inner: RecognitionSession, recognizer: "RecordingRecognizer", source: str):
+        self.inner = inner
+        self.recognizer = recognizer
+        self.source = source
+        self.last_partial = None
+
+    def feed(self, chunk: bytes) -> Optional[str]:
+        partial = self.inner.feed(chunk)
+        if partial:
+            self.last_partial = partial
+        return partial
+
+    def finish(self) -> Optional[str]:
+        text = self.inner.finish()
+        self.recognizer.record(self.source, text)
+        return text
+
+    def cancel(self):
+        self.inner.cancel()
+        self.recognizer.record(self.source, self.last_partial)
+
+
+class RecordingRecognizer(Recognizer):
+    """
+    Wraps another recognizer and appends every utterance's transcript (None
+    if nothing was understood) to a JSON lines file in the format read by
+    FakeStreamingRecognizer.from_file, so captured traffic can be replayed
+    with the same recognition results.
+    """
+
+    def __init__(self, inner: Recognizer, path: str):
+        self.inner = inner
+        self.streaming = inner.streaming
+        self.path = path
+        self._lock = threading.Lock()
+
+    def start(self, client_address: Address) -> RecognitionSession:
+        return _RecordingSession(self.inner.start(client_address), self, client_address[0])
+
+    def record(self, source: str, text: Optional[str]):
+        line = json.dumps({"source": source, "time": time.time(), "text": text})
+        with self._lock:
+            with open(self.path, "a") as f:
+                f.write(line + "\n")
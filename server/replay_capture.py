@@ -0,0 +1,214 @@
+"""
+Replays UDP traffic recorded with UDP_CAPTURE_PATH against a running server.
+
+Every board in the capture gets its own loopback address (127.1.x.y), so the
+server sees the same number of distinct devices as in the field.
+
+    # 1. Remap the recorded transcripts to the replay addresses
+    python replay_capture.py prepare capture.bin -o replay_transcripts.jsonl
+
+    # 2. Start the server with the scripted recognizer
+    RECOGNIZER=fake FAKE_TRANSCRIPTS_PATH=replay_transcripts.jsonl python main.py
+
+    # 3. Replay at 1x, 10x or as fast as possible and save a summary
+    python replay_capture.py replay capture.bin --speed 10 --server-pid <pid> -o run.json
+
+    # 4. Compare two runs
+    python replay_capture.py compare baseline.json run.json
+
+With sharded audio workers pass every capture file (capture.bin and
+capture.bin.worker*); they are merged by arrival time.
+"""
+import argparse
+import json
+import os
+import socket
+import sys
+import time
+import urllib.request
+from typing import Dict, List
+
+from udp_capture import merge_captures
+
+
+def replay_address(index: int) -> str:
+    return f"127.1.{index // 254}.{index % 254 + 1}"
+
+
+def build_address_map(paths: List[str]) -> Dict[str, str]:
+    """Original board IP -> loopback replay IP, in order of first appearance"""
+    mapping: Dict[str, str] = {}
+    for _, _, (ip, _), _ in merge_captures(*paths):
+        if ip not in mapping:
+            mapping[ip] = replay_address(len(mapping))
+    return mapping
+
+
+def prepare(args):
+    mapping = build_address_map(args.captures)
+
+    records = []
+    for path in args.captures:
+        transcripts_path = f"{path}.transcripts.jsonl"
+        if not os.path.exists(transcripts_path):
+            continue
+        with open(transcripts_path) as f:
+            records.extend(json.loads(line) for line in f if line.strip())
+
+    records.sort(key=lambda record: record.get("time", 0))
+    with open(args.output, "w") as f:
+        for record in records:
+            record["source"] = mapping.get(record["source"], record["source"])
+            f.write(json.dumps(record) + "\n")
+
+    print(f"Wrote {len(records)} transcripts for {len(mapping)} boards to {args.output}")
+
+
+def process_cpu_seconds(pid: int) -> float:
+    """utime + stime of a process, from /proc (Linux only)"""
+    with open(f"/proc/{pid}/stat") as f:
+        fields = f.read().rsplit(")", 1)[1].split()
+    return (int(fields[11]) + int(fields[12])) / os.sysconf("SC_CLK_TCK")
+
+
+def fetch_json(url: str):
+    try:
+        with urllib.request.urlopen(url, timeout=5) as response:
+            return json.load(response)
+    except OSError as e:
+        return {"error": str(e)}
+
+
+def replay(args):
+    mapping = build_address_map(args.captures)
+    speed = None if args.fast else args.speed
+
+    sockets: Dict[tuple, socket.socket] = {}
+
+    def socket_for(source):
+        sock = sockets.get(source)
+        if sock is None:
+            sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+            try:
+                # Keep the board's source port when it is free (e.g. its control port)
+                sock.bind((mapping[source[0]], source[1]))
+            except OSError:
+                sock.bind((mapping[source[0]], 0))
+            sockets[source] = sock
+        return sock
+
+    cpu_before = process_cpu_seconds(args.server_pid) if args.server_pid else None
+
+    packets = 0
+    payload_bytes = 0
+    per_port: Dict[int, int] = {}
+    max_lag = 0.0
+    first_timestamp = None
+    last_timestamp = None
+    start = time.perf_counter()
+
+    for timestamp, port, source, payload in merge_captures(*args.captures):
+        if first_timestamp is None:
+            first_timestamp = timestamp
+        last_timestamp = timestamp
+
+        if speed:
+            due = start + (timestamp - first_timestamp) / speed
+            delay = due - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            else:
+                max_lag = max(max_lag, -delay)
+
+        socket_for(source).sendto(payload, (args.host, port))
+        packets += 1
+        payload_bytes += len(payload)
+        per_port[port] = per_port.get(port, 0) + 1
+
+    elapsed = time.perf_counter() - start
+    capture_span = (last_timestamp - first_timestamp) if packets else 0.0
+    print(f"Replayed {packets} datagrams from {len(mapping)} boards in {elapsed:.2f}s "
+          f"(capture span {capture_span:.2f}s)")
+
+    # Give the server time to finish the last utterances before sampling it
+    time.sleep(args.settle)
+
+    summary = {
+        "captures": args.captures,
+        "speed": "fast" if args.fast else args.speed,
+        "boards": len(mapping),
+        "packets": packets,
+        "payload_bytes": payload_bytes,
+        "packets_per_port": {str(port): count for port, count in per_port.items()},
+        "capture_span_seconds": capture_span,
+        "replay_seconds": elapsed,
+        "max_send_lag_ms": max_lag * 1000,
+    }
+    if cpu_before is not None:
+        summary["server_cpu_seconds"] = process_cpu_seconds(args.server_pid) - cpu_before
+    if args.api:
+        summary["recognition"] = fetch_json(f"{args.api}/api/recognition/stats")
+        summary["command_delivery"] = fetch_json(f"{args.api}/api/commands/delivery")
+
+    print(json.dumps(summary, indent=2))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(summary, f, indent=2)
+
+
+def _flatten(value, prefix=""):
+    if isinstance(value, dict):
+        for key, item in value.items():
+            yield from _flatten(item, f"{prefix}{key}.")
+    elif isinstance(value, (int, float)) and not isinstance(value, bool):
+        yield prefix.rstrip("."), value
+
+
+def compare(args):
+    with open(args.baseline) as f:
+        baseline = dict(_flatten(json.load(f)))
+    with open(args.run) as f:
+        run = dict(_flatten(json.load(f)))
+
+    print(f"{'metric':<45}{'baseline':>14}{'run':>14}{'change':>10}")
+    for key, after in run.items():
+        if key not in baseline:
+            continue
+        before = baseline[key]
+        change = f"{(after - before) / before * 100:+.1f}%" if before else "-"
+        print(f"{key:<45}{before:>14.3f}{after:>14.3f}{change:>10}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    prepare_parser = commands.add_parser("prepare", help="remap recorded transcripts for the fake recognizer")
+    prepare_parser.add_argument("captures", nargs="+")
+    prepare_parser.add_argument("-o", "--output", default="replay_transcripts.jsonl")
+    prepare_parser.set_defaults(func=prepare)
+
+    replay_parser = commands.add_parser("replay", help="send a capture to the server")
+    replay_parser.add_argument("captures", nargs="+")
+    replay_parser.add_argument("--host", default="127.0.0.1", help="server address")
+    replay_parser.add_argument("--speed", type=float, default=1.0, help="time scale, e.g. 10 for 10x")
+    replay_parser.add_argument("--fast", action="store_true", help="send as fast as possible")
+    replay_parser.add_argument("--settle", type=float, default=2.0, help="seconds to wait before sampling stats")
+    replay_parser.add_argument("--server-pid", type=int, help="sample this process's CPU time")
+    replay_parser.add_argument("--api", default="http://127.0.0.1:5000", help="server HTTP API ('' to skip)")
+    replay_parser.add_argument("-o", "--output", help="write the run summary as JSON")
+    replay_parser.set_defaults(func=replay)
+
+    compare_parser = commands.add_parser("compare", help="compare two replay summaries")
+    compare_parser.add_argument("baseline")
+    compare_parser.add_argument("run")
+    compare_parser.set_defaults(func=compare)
+
+    args = parser.parse_args()
+    if getattr(args, "speed", 1.0) <= 0:
+        sys.exit("--speed must be positive")
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+import json
+import threading
+from datetime import date, datetime
+from typing import Any, Callable, Dict, Hashable
+
+from fastapi.responses import Response
+
+try:
+    import orjson
+except ImportError:  # falls back to the stdlib encoder
+    orjson = None
+
+
+def _default(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if hasattr(value, "tolist"):  # NumPy arrays and scalars
+        return value.tolist()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def dumps(content: Any) -> bytes:
+    """Encode to compact UTF-8 JSON, with orjson when it is installed"""
+    if orjson is not None:
+        return orjson.dumps(content, default=_default,
+                            option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY)
+    return json.dumps(content, default=_default, ensure_ascii=False,
+                      separators=(",", ":")).encode("utf-8")
+
+
+class FastJSONResponse(Response):
+    """
+    JSON response encoded with `dumps`. Returning it directly from an
+    endpoint also skips FastAPI's jsonable_encoder pass.
+    """
+
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+class EncodedBodyCache:
+    """
+    Encoded response bodies for hot read endpoints. A body is reused until the
+    version passed in for its key changes (e.g. a table's write counter).
+    """
+
+    def __init__(self, max_entries: int = 64):
+        self.max_entries = max_entries
+        self._bodies: Dict[Hashable, tuple] = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable, version: int, build: Callable[[], Any]) -> bytes:
+        with self._lock:
+            cached = self._bodies.get(key)
+            if cached is not None and cached[0] == version:
+                return cached[1]
+
+        body = dumps(build())
+        with self._lock:
+            if len(self._bodies) >= self.max_entries and key not in self._bodies:
+                self._bodies.clear()
+            self._bodies[key] = (version, body)
+        return body
+
+    def response(self, key: Hashable, version: int, build: Callable[[], Any]) -> Response:
+        return Response(content=self.get(key, version, build), media_type="application/json")
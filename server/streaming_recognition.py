@@ -0,0 +1,124 @@
+import threading
+import time
+from typing import Callable, Dict, Optional, Tuple
+
+from recognizers import Recognizer
+from voice_commands import parse_partial_command, parse_voice_command
+
+Address = Tuple[str, int]
+
+
+class StreamingUtteranceTracker:
+    """
+    Feeds audio packets into a recognition session per board as they arrive.
+
+    Every partial hypothesis is run through the intent matcher; as soon as it
+    yields a complete, unambiguous command that command is dispatched and the
+    rest of the utterance is ignored. Utterances that never match early fall
+    back to the final transcript when the audio buffer completes.
+    """
+
+    def __init__(self, recognizer: Recognizer,
+                 on_command: Callable[[str, Optional[Dict], Address], None],
+                 on_utterance_done: Optional[Callable[[Dict], None]] = None):
+        self.recognizer = recognizer
+        self.on_command = on_command
+        self.on_utterance_done = on_utterance_done
+        self.utterances: Dict[Address, Dict] = {}
+
+    def feed(self, data: bytes, addr: Address, now: Optional[float] = None):
+        if now is None:
+            now = time.time()
+
+        utterance = self.utterances.get(addr)
+        if utterance is None:
+            utterance = {
+                'session': self.recognizer.start(addr),
+                'started_at': now,
+                'last_packet_time': now,
+                'dispatched_at': None,
+            }
+            self.utterances[addr] = utterance
+
+        utterance['last_packet_time'] = now
+        if utterance['dispatched_at'] is not None:
+            # Command already sent; the rest of the utterance is not recognized
+            return
+
+        partial = utterance['session'].feed(data)
+        if not partial:
+            return
+
+        command = parse_partial_command(partial)
+        if command:
+            utterance['dispatched_at'] = now
+            utterance['session'].cancel()
+            print(f"[STREAM] Early match on partial '{partial}' from {addr}: {command['command_str']}")
+            self.on_command(partial, command, addr)
+
+    def finish(self, addr: Address, recognize: bool = True):
+        """
+        End of utterance (buffer full or board went quiet). With
+        `recognize=False` the remaining audio is dropped without a final pass.
+        """
+        utterance = self.utterances.pop(addr, None)
+        if utterance is None:
+            return
+
+        early = utterance['dispatched_at'] is not None
+        if early:
+            # Lower bound: also saves the final recognition round trip
+            saved_seconds = max(0.0, utterance['last_packet_time'] - utterance['dispatched_at'])
+            action_at = utterance['dispatched_at']
+        else:
+            saved_seconds = 0.0
+            if not recognize:
+                utterance['session'].cancel()
+                return
+            text = utterance['session'].finish()
+            action_at = time.time()
+            if text is None:
+                return
+            self.on_command(text, parse_voice_command(text), addr)
+
+        summary = {
+            'early': early,
+            'time_to_action_seconds': action_at - utterance['started_at'],
+            'saved_seconds': saved_seconds,
+        }
+        print(f"[STREAM] Utterance from {addr} done: early={early}, "
+              f"time to action {summary['time_to_action_seconds']:.2f}s, saved {saved_seconds:.2f}s")
+        if self.on_utterance_done:
+            self.on_utterance_done(summary)
+
+    def discard(self, addr: Address):
+        self.finish(addr, recognize=False)
+
+
+class RecognitionStats:
+    """Aggregated time-to-action numbers for the streaming recognition mode"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.utterances = 0
+        self.early_dispatches = 0
+        self.total_time_to_action_seconds = 0.0
+        self.total_saved_seconds = 0.0
+
+    def record(self, summary: Dict):
+        with self._lock:
+            self.utterances += 1
+            self.early_dispatches += 1 if summary['early'] else 0
+            self.total_time_to_action_seconds += summary['time_to_action_seconds']
+            self.total_saved_seconds += summary['saved_seconds']
+
+    def get_stats(self) -> Dict:
+        with self._lock:
+            count = self.utterances or 1
+            return {
+                'utterances': self.utterances,
+                'early_dispatches': self.early_dispatches,
+                'avg_time_to_action_ms': self.total_time_to_action_seconds / count * 1000,
+                'avg_saved_ms': self.total_saved_seconds / count * 1000,
+                'total_saved_seconds': self.total_saved_seconds,
+            }
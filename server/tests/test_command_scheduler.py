@@ -0,0 +1,175 @@
+from command_scheduler import CommandScheduler, expected_state
+
+DEVICE_ID = "esp32_10_0_0_1"
+DEVICE_IP = "10.0.0.1"
+CONTROL_PORT = 12346
+
+
+class FakeSocket:
+    def __init__(self):
+        self.sent = []
+
+    def sendto(self, data, addr):
+        self.sent.append(data.decode("utf-8"))
+
+
+def make_scheduler(**kwargs):
+    sock = FakeSocket()
+    options = dict(min_interval_seconds=0.05, ack_timeout_seconds=0.5, max_retries=3, backoff_factor=2.0)
+    options.update(kwargs)
+    return CommandScheduler(sock, CONTROL_PORT, **options), sock
+
+
+def run_until(scheduler, end, start=0.0, step=0.01):
+    now = start
+    while now <= end:
+        scheduler.run_pending(now)
+        now = round(now + step, 6)
+
+
+def test_expected_state():
+    assert expected_state("LED1_RED") == {"LED1": "RED"}
+    assert expected_state("LED1_ON") == {"LED1": "WHITE"}
+    assert expected_state("LED2_ON") == {"LED2": "ON"}
+    assert expected_state("ALL_BLUE") == {"LED1": "BLUE", "LED2": "ON"}
+    assert expected_state("ALL_OFF") == {"LED1": "OFF", "LED2": "OFF"}
+    assert expected_state("BOGUS") == {}
+
+
+def test_coalesces_queued_commands_for_same_led():
+    scheduler, sock = make_scheduler()
+    dispatched = []
+
+    for color in ("RED", "GREEN", "BLUE"):
+        scheduler.submit(DEVICE_ID, DEVICE_IP, f"LED1_{color}",
+                         on_dispatch=lambda command_str, expected: dispatched.append(command_str))
+    scheduler.run_pending(0.0)
+
+    assert sock.sent == ["LED1_BLUE"]
+    assert dispatched == ["LED1_BLUE"]
+    assert scheduler.get_stats()['coalesced'] == 2
+
+
+def test_all_supersedes_queued_single_led_commands():
+    scheduler, sock = make_scheduler()
+
+    scheduler.submit(DEVICE_ID, DEVICE_IP, "LED1_RED")
+    scheduler.submit(DEVICE_ID, DEVICE_IP, "LED2_ON")
+    scheduler.submit(DEVICE_ID, DEVICE_IP, "ALL_OFF")
+    run_until(scheduler, 0.2)
+
+    assert sock.sent == ["ALL_OFF"]
+
+
+def test_single_led_command_narrows_in_flight_all():
+    scheduler, sock = make_scheduler()
+
+    scheduler.submit(DEVICE_ID, DEVICE_IP, "ALL_RED")
+    scheduler.run_pending(0.0)
+    scheduler.submit(DEVICE_ID, DEVICE_IP, "LED1_BLUE")
+    run_until(scheduler, 0.6, start=0.1)
+
+    # The retry of the older ALL only resends the LED it still owns
+    assert sock.sent == ["ALL_RED", "LED1_BLUE", "LED2_ON", "LED1_BLUE"]
+
+    assert scheduler.confirm(DEVICE_ID, "BLUE", "ON")
+    assert scheduler.get_stats()['in_flight'] == 0
+
+
+def test_single_led_commands_drop_queued_all():
+    scheduler, sock = make_scheduler()
+    dispatched = []
+
+    scheduler.submit(DEVICE_ID, DEVICE_IP, "ALL_RED", on_dispatch=lambda *sent: dispatched.append(sent))
+    scheduler.submit(DEVICE_ID, DEVICE_IP, "LED1_BLUE")
+    scheduler.submit(DEVICE_ID, DEVICE_IP, "LED2_OFF")
+    run_until(scheduler, 0.2)
+
+    assert sock.sent == ["LED1_BLUE", "LED2_OFF"]
+    assert dispatched == []
+
+
+def test_single_led_command_narrows_queued_all_in_place():
+    scheduler, sock = make_scheduler()
+    dispatched = []
+
+    scheduler.submit(DEVICE_ID, DEVICE_IP, "ALL_RED", on_dispatch=lambda *sent: dispatched.append(sent))
+    scheduler.submit(DEVICE_ID, DEVICE_IP, "LED1_BLUE", on_dispatch=lambda *sent: dispatched.append(sent))
+    run_until(scheduler, 0.2)
+
+    assert sock.sent == ["LED2_ON", "LED1_BLUE"]
+    # The narrowed ALL only reports the LED it still drove
+    assert dispatched == [("LED2_ON", {"LED2": "ON"}), ("LED1_BLUE", {"LED1": "BLUE"})]
+
+
+def test_narrowed_in_flight_all_reports_what_was_sent():
+    scheduler, _ = make_scheduler(max_retries=0)
+    dispatched = []
+    failed = []
+
+    scheduler.submit(DEVICE_ID, DEVICE_IP, "ALL_RED",
+                     on_dispatch=lambda *sent: dispatched.append(sent), on_failed=lambda *sent: failed.append(sent))
+    scheduler.run_pending(0.0)
+    scheduler.submit(DEVICE_ID, DEVICE_IP, "LED1_BLUE")
+    run_until(scheduler, 1.0, start=0.1)
+
+    # ALL_RED really went out, so its dispatch is unchanged; the failure is
+    # reported for the LED it still owned
+    assert dispatched == [("ALL_RED", {"LED1": "RED", "LED2": "ON"})]
+    assert failed == [("LED2_ON", {"LED2": "ON"})]
+
+
+def test_retries_with_backoff_then_fails():
+    scheduler, sock = make_scheduler()
+    failed = []
+
+    scheduler.submit(DEVICE_ID, DEVICE_IP, "LED1_RED", on_failed=lambda *sent: failed.append(sent))
+
+    scheduler.run_pending(0.0)
+    for now, expected_sends in [(0.49, 1), (0.5, 2), (1.49, 2), (1.5, 3), (3.49, 3), (3.5, 4), (7.49, 4)]:
+        scheduler.run_pending(now)
+        assert len(sock.sent) == expected_sends, now
+    assert failed == []
+
+    scheduler.run_pending(7.5)
+    assert len(sock.sent) == 4
+    assert failed == [("LED1_RED", {"LED1": "RED"})]
+
+    stats = scheduler.get_stats()
+    assert stats['retries'] == 3
+    assert stats['failed'] == 1
+    assert stats['in_flight'] == 0
+
+
+def test_confirm_stops_retries():
+    scheduler, sock = make_scheduler()
+
+    scheduler.submit(DEVICE_ID, DEVICE_IP, "ALL_ON")
+    scheduler.run_pending(0.0)
+
+    assert not scheduler.confirm(DEVICE_ID, "WHITE", "OFF")
+    assert scheduler.confirm(DEVICE_ID, "WHITE", "ON")
+    run_until(scheduler, 2.0, start=0.1)
+
+    assert sock.sent == ["ALL_ON"]
+    assert scheduler.get_stats()['confirmed'] == 1
+
+
+def test_confirm_unknown_device():
+    scheduler, _ = make_scheduler()
+    assert not scheduler.confirm("esp32_unknown", "RED", "ON")
+
+
+def test_paces_sends_per_board():
+    scheduler, sock = make_scheduler(min_interval_seconds=0.1)
+
+    scheduler.submit(DEVICE_ID, DEVICE_IP, "LED1_RED")
+    scheduler.submit(DEVICE_ID, DEVICE_IP, "LED2_ON")
+    scheduler.submit("esp32_10_0_0_2", "10.0.0.2", "LED1_RED")
+
+    assert scheduler.run_pending(0.0) == 0.1
+    assert sock.sent == ["LED1_RED", "LED1_RED"]
+    scheduler.run_pending(0.05)
+    assert len(sock.sent) == 2
+    scheduler.run_pending(0.1)
+    assert sock.sent[-1] == "LED2_ON"
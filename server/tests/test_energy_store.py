@@ -0,0 +1,88 @@
+import random
+import time
+from datetime import datetime, timezone
+
+import pytest
+
+pytest.importorskip("numpy")
+
+from database import Database  # noqa: E402
+
+DEVICES = [f"esp32_10_0_0_{i}" for i in range(5)]
+COLORS = ["LED1_OFF", "LED1_RED", "LED1_WHITE", "LED2_ON", "LED2_OFF"]
+POWERS = [0.0, 0.066, 0.132, 0.198]
+
+
+def make_samples(count=400, seed=1):
+    """(epoch, device_id, power, duration, color), one per second, some outside the window"""
+    rng = random.Random(seed)
+    now = int(time.time())
+    ages = rng.sample(range(60, 23 * 3600), count) + rng.sample(range(49 * 3600, 60 * 3600), 20)
+    return [(now - age, rng.choice(DEVICES), rng.choice(POWERS), rng.random() * 600, rng.choice(COLORS))
+            for age in ages]
+
+
+def seed_sqlite(db, samples):
+    conn = db.get_connection()
+    conn.executemany(
+        "INSERT INTO energy_logs (timestamp, device_id, power_watts, duration_seconds, energy_wh, color) "
+        "VALUES (?, ?, ?, ?, ?, ?)",
+        [(datetime.fromtimestamp(epoch, tz=timezone.utc).strftime("%Y-%m-%d %H:%M:%S"),
+          device_id, power, duration, power * duration / 3600, color)
+         for epoch, device_id, power, duration, color in samples],
+    )
+    conn.commit()
+    conn.close()
+
+
+def assert_same_stats(expected, actual):
+    assert actual['entries'] == expected['entries']
+    for key in ('total_energy_wh', 'total_duration', 'avg_power'):
+        assert actual[key] == pytest.approx(expected[key], rel=1e-6), key
+
+
+def assert_same_timeline(expected, actual):
+    assert len(actual) == len(expected)
+    for expected_row, row in zip(expected, actual):
+        assert row.keys() == expected_row.keys()
+        assert row['time'] == expected_row['time']
+        assert row['color'] == expected_row['color']
+        assert row.get('device_id') == expected_row.get('device_id')
+        # float32 storage is rounded back to the logged values
+        assert row['power_watts'] == expected_row['power_watts']
+        assert row['energy_wh'] == pytest.approx(expected_row['energy_wh'], rel=1e-6)
+
+
+def assert_same_queries(sqlite_db, columnar_db):
+    for device_id in [None, DEVICES[0], "esp32_unknown"]:
+        assert_same_stats(sqlite_db._query_energy_stats(device_id, 24),
+                          columnar_db._query_energy_stats(device_id, 24))
+        assert_same_timeline(sqlite_db._query_energy_timeline(device_id, 24),
+                             columnar_db._query_energy_timeline(device_id, 24))
+
+
+def test_columnar_matches_sqlite(tmp_path):
+    samples = make_samples()
+    sqlite_db = Database(str(tmp_path / "sqlite.db"))
+    seed_sqlite(sqlite_db, samples)
+
+    columnar_db = Database(str(tmp_path / "columnar.db"), energy_backend="columnar",
+                           energy_store_path=str(tmp_path / "energy_store"))
+    for epoch, device_id, power, duration, color in sorted(samples):
+        columnar_db.energy_store.add_energy_log(device_id, power, duration, color, timestamp=epoch)
+
+    assert_same_queries(sqlite_db, columnar_db)
+
+
+def test_new_columnar_store_is_backfilled_from_sqlite(tmp_path):
+    db_path = str(tmp_path / "home_automation.db")
+    sqlite_db = Database(db_path)
+    seed_sqlite(sqlite_db, make_samples())
+
+    columnar_db = Database(db_path, energy_backend="columnar", energy_store_path=str(tmp_path / "energy_store"))
+    assert not columnar_db.energy_store.is_empty()
+    assert_same_queries(sqlite_db, columnar_db)
+
+    # An existing store is not backfilled a second time
+    reopened = Database(db_path, energy_backend="columnar", energy_store_path=str(tmp_path / "energy_store"))
+    assert_same_stats(sqlite_db._query_energy_stats(None, 24), reopened._query_energy_stats(None, 24))
@@ -0,0 +1,143 @@
+import threading
+import time
+
+import pytest
+
+from query_cache import QueryCache
+
+
+class Clock:
+    def __init__(self, now=0.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+class Counter:
+    """compute() stand-in that counts its calls"""
+
+    def __init__(self):
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        return self.calls
+
+
+def test_hit_after_miss():
+    cache = QueryCache(clock=Clock())
+    compute = Counter()
+
+    assert cache.get_or_compute("stats", None, 24, compute) == 1
+    assert cache.get_or_compute("stats", None, 24, compute) == 1
+    assert cache.get_or_compute("stats", None, 12, compute) == 2
+    assert cache.get_stats() == {'entries': 2, 'hits': 1, 'misses': 2}
+
+
+def test_invalidation_during_compute_is_not_cached_as_fresh():
+    cache = QueryCache(clock=Clock())
+    calls = []
+
+    def compute():
+        calls.append(True)
+        if len(calls) == 1:
+            # A write lands while the query is running
+            cache.invalidate("esp32_1")
+        return len(calls)
+
+    assert cache.get_or_compute("stats", "esp32_1", 24, compute) == 1
+    assert cache.get_or_compute("stats", "esp32_1", 24, compute) == 2
+    assert cache.get_or_compute("stats", "esp32_1", 24, compute) == 2
+
+
+def test_device_invalidation_also_invalidates_unfiltered_queries():
+    cache = QueryCache(clock=Clock())
+    compute = Counter()
+
+    cache.get_or_compute("stats", None, 24, compute)
+    cache.get_or_compute("stats", "esp32_1", 24, compute)
+    cache.get_or_compute("stats", "esp32_2", 24, compute)
+    assert compute.calls == 3
+
+    cache.invalidate("esp32_1")
+    cache.get_or_compute("stats", None, 24, compute)
+    cache.get_or_compute("stats", "esp32_1", 24, compute)
+    assert compute.calls == 5
+
+    # Other devices' entries stay valid
+    cache.get_or_compute("stats", "esp32_2", 24, compute)
+    assert compute.calls == 5
+
+
+def test_concurrent_misses_compute_once():
+    cache = QueryCache(clock=Clock())
+    release = threading.Event()
+    calls = []
+
+    def compute():
+        calls.append(True)
+        release.wait(5)
+        return "result"
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(cache.get_or_compute("timeline", None, 24, compute)))
+               for _ in range(8)]
+    for thread in threads:
+        thread.start()
+
+    # Let the first caller start computing and the rest queue up behind it
+    deadline = time.time() + 5
+    while not calls and time.time() < deadline:
+        time.sleep(0.001)
+    time.sleep(0.05)
+    release.set()
+    for thread in threads:
+        thread.join(5)
+
+    assert len(calls) == 1
+    assert results == ["result"] * 8
+    assert cache.get_stats()['misses'] == 1
+
+
+def test_failed_compute_is_retried():
+    cache = QueryCache(clock=Clock())
+
+    def fail():
+        raise RuntimeError("db locked")
+
+    with pytest.raises(RuntimeError):
+        cache.get_or_compute("stats", None, 24, fail)
+    assert cache.get_or_compute("stats", None, 24, lambda: "ok") == "ok"
+
+
+def test_entries_expire_at_ttl_bucket_boundary():
+    clock = Clock(4.9)
+    cache = QueryCache(ttl_seconds=5.0, clock=clock)
+    compute = Counter()
+
+    cache.get_or_compute("stats", None, 24, compute)
+    clock.now = 4.999
+    cache.get_or_compute("stats", None, 24, compute)
+    assert compute.calls == 1
+
+    clock.now = 5.0
+    cache.get_or_compute("stats", None, 24, compute)
+    assert compute.calls == 2
+
+
+def test_evicts_least_recently_used():
+    cache = QueryCache(max_entries=2, clock=Clock())
+    compute = Counter()
+
+    cache.get_or_compute("stats", "a", 24, compute)
+    cache.get_or_compute("stats", "b", 24, compute)
+    cache.get_or_compute("stats", "a", 24, compute)  # "a" is now the most recent
+    cache.get_or_compute("stats", "c", 24, compute)
+    assert compute.calls == 3
+    assert cache.get_stats()['entries'] == 2
+
+    cache.get_or_compute("stats", "a", 24, compute)
+    assert compute.calls == 3
+    cache.get_or_compute("stats", "b", 24, compute)
+    assert compute.calls == 4
@@ -0,0 +1,139 @@
+import json
+
+from recognizers import FakeStreamingRecognizer
+from streaming_recognition import RecognitionStats, StreamingUtteranceTracker
+from voice_commands import parse_partial_command, parse_voice_command
+
+BOARD = ("10.0.0.1", 40000)
+BYTES_PER_WORD = 100
+CHUNK = b"\x00" * BYTES_PER_WORD
+
+
+def make_tracker(transcripts):
+    commands = []
+    summaries = []
+    recognizer = FakeStreamingRecognizer(transcripts, bytes_per_word=BYTES_PER_WORD)
+    tracker = StreamingUtteranceTracker(
+        recognizer,
+        lambda text, command, addr: commands.append((text, command, addr)),
+        summaries.append,
+    )
+    return tracker, commands, summaries
+
+
+def test_parse_partial_command_needs_one_target_and_one_action():
+    assert parse_partial_command("turn light") is None
+    assert parse_partial_command("turn light one") is None
+    assert parse_partial_command("make it purple") is None
+    assert parse_partial_command("turn both lights to red") is None
+    assert parse_partial_command("turn light one red green") is None
+    assert parse_partial_command("turn light one red") == parse_voice_command("turn light one red")
+    assert parse_partial_command("switch light two off")['command_str'] == "LED2_OFF"
+
+
+def test_early_match_dispatches_and_cancels_session():
+    tracker, commands, summaries = make_tracker({"10.0.0.1": ["turn light one red please now"]})
+
+    for i in range(3):
+        tracker.feed(CHUNK, BOARD, now=float(i))
+    assert commands == []
+
+    tracker.feed(CHUNK, BOARD, now=3.0)
+    assert len(commands) == 1
+    text, command, addr = commands[0]
+    assert text == "turn light one red"
+    assert command['command_str'] == "LED1_RED"
+    assert addr == BOARD
+
+    session = tracker.utterances[BOARD]['session']
+    assert session.cancelled
+
+    # The rest of the utterance is not recognized
+    tracker.feed(CHUNK, BOARD, now=4.0)
+    tracker.feed(CHUNK, BOARD, now=5.0)
+    tracker.finish(BOARD)
+    assert len(commands) == 1
+
+    assert summaries == [{'early': True, 'time_to_action_seconds': 3.0, 'saved_seconds': 2.0}]
+    assert BOARD not in tracker.utterances
+
+
+def test_falls_back_to_final_transcript():
+    tracker, commands, summaries = make_tracker({"*": ["make it purple"]})
+
+    for i in range(3):
+        tracker.feed(CHUNK, BOARD, now=float(i))
+    assert commands == []
+
+    tracker.finish(BOARD)
+    assert commands == [("make it purple", parse_voice_command("make it purple"), BOARD)]
+    assert commands[0][1]['command_str'] == "ALL_PURPLE"
+    assert len(summaries) == 1
+    assert not summaries[0]['early']
+    assert summaries[0]['saved_seconds'] == 0.0
+
+
+def test_final_transcript_without_command_is_still_reported():
+    tracker, commands, _ = make_tracker({"*": ["what is the weather"]})
+
+    tracker.feed(CHUNK * 4, BOARD, now=0.0)
+    tracker.finish(BOARD)
+
+    assert commands == [("what is the weather", None, BOARD)]
+
+
+def test_discard_drops_utterance_without_recognizing():
+    tracker, commands, summaries = make_tracker({"*": ["make it purple"]})
+
+    tracker.feed(CHUNK, BOARD, now=0.0)
+    session = tracker.utterances[BOARD]['session']
+    tracker.discard(BOARD)
+
+    assert session.cancelled
+    assert commands == []
+    assert summaries == []
+    assert BOARD not in tracker.utterances
+
+    # Discarding an unknown board is a no-op
+    tracker.discard(("10.0.0.9", 40000))
+
+
+def test_discard_after_early_match_keeps_the_command():
+    tracker, commands, summaries = make_tracker({"*": ["light two off"]})
+
+    for i in range(3):
+        tracker.feed(CHUNK, BOARD, now=float(i))
+    tracker.discard(BOARD)
+
+    assert [command['command_str'] for _, command, _ in commands] == ["LED2_OFF"]
+    assert len(summaries) == 1 and summaries[0]['early']
+
+
+def test_fake_recognizer_queues(tmp_path):
+    path = tmp_path / "transcripts.jsonl"
+    path.write_text("\n".join(json.dumps(record) for record in [
+        {"source": "10.0.0.1", "text": "light one red"},
+        {"source": "10.0.0.1", "text": "light one blue"},
+        {"text": "both lights off"},
+    ]) + "\n")
+    recognizer = FakeStreamingRecognizer.from_file(str(path), bytes_per_word=BYTES_PER_WORD)
+
+    assert recognizer.start(BOARD).finish() == "light one red"
+    assert recognizer.start(BOARD).finish() == "light one blue"
+    # Falls back to the shared queue, then runs dry
+    assert recognizer.start(BOARD).finish() == "both lights off"
+    assert recognizer.start(("10.0.0.2", 40000)).finish() is None
+
+
+def test_recognition_stats():
+    stats = RecognitionStats()
+    assert stats.get_stats()['utterances'] == 0
+
+    stats.record({'early': True, 'time_to_action_seconds': 1.0, 'saved_seconds': 2.0})
+    stats.record({'early': False, 'time_to_action_seconds': 3.0, 'saved_seconds': 0.0})
+
+    result = stats.get_stats()
+    assert result['utterances'] == 2
+    assert result['early_dispatches'] == 1
+    assert result['avg_time_to_action_ms'] == 2000.0
+    assert result['avg_saved_ms'] == 1000.0
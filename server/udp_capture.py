@@ -0,0 +1,82 @@
+import atexit
+import heapq
+import socket
+import struct
+import threading
+import time
+from typing import Iterator, Optional, Tuple
+
+MAGIC = b"VCHACAP1"
+
+# Per datagram: arrival time, local port, source IPv4, source port, payload length
+RECORD_HEADER = struct.Struct("<dH4sHH")
+
+CapturedDatagram = Tuple[float, int, Tuple[str, int], bytes]
+
+
+class CaptureWriter:
+    """
+    Appends received UDP datagrams to a compact binary log. Records go
+    through a large write buffer, so the listeners only pay for one
+    struct.pack and a memory copy per packet. The buffer is flushed at most
+    every `flush_interval` seconds, which bounds what a killed worker loses.
+    """
+
+    def __init__(self, path: str, buffer_size: int = 1 << 20, flush_interval: float = 1.0):
+        self.path = path
+        self.flush_interval = flush_interval
+        self._last_flush = time.time()
+        self._lock = threading.Lock()
+        self._file = open(path, "ab", buffering=buffer_size)
+        if self._file.tell() == 0:
+            self._file.write(MAGIC)
+        atexit.register(self.close)
+        print(f"[CAPTURE] Recording UDP traffic to {path}")
+
+    def record(self, port: int, addr: Tuple[str, int], payload: bytes, timestamp: Optional[float] = None):
+        now = time.time()
+        header = RECORD_HEADER.pack(
+            now if timestamp is None else timestamp,
+            port,
+            socket.inet_aton(addr[0]),
+            addr[1],
+            len(payload),
+        )
+        with self._lock:
+            self._file.write(header)
+            self._file.write(payload)
+            if now - self._last_flush >= self.flush_interval:
+                self._file.flush()
+                self._last_flush = now
+
+    def flush(self):
+        with self._lock:
+            self._file.flush()
+
+    def close(self):
+        with self._lock:
+            if not self._file.closed:
+                self._file.close()
+
+
+def read_capture(path: str) -> Iterator[CapturedDatagram]:
+    """Yield (timestamp, port, (source ip, source port), payload) in file order"""
+    with open(path, "rb") as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f"{path} is not a UDP capture file")
+
+        while True:
+            header = f.read(RECORD_HEADER.size)
+            if len(header) < RECORD_HEADER.size:
+                # End of file (or a record cut short by a crash)
+                return
+            timestamp, port, ip, src_port, length = RECORD_HEADER.unpack(header)
+            payload = f.read(length)
+            if len(payload) < length:
+                return
+            yield timestamp, port, (socket.inet_ntoa(ip), src_port), payload
+
+
+def merge_captures(*paths: str) -> Iterator[CapturedDatagram]:
+    """Merge several capture files (e.g. one per audio worker) by arrival time"""
+    return heapq.merge(*(read_capture(path) for path in paths), key=lambda datagram: datagram[0])
@@ -0,0 +1,122 @@
+from typing import Dict, Optional
+
+# Spoken forms of the LED numbers that the recognizer tends to return
+NORMALIZE_REPLACEMENTS = [
+    (" light one", " light 1"),
+    (" led one", " led 1"),
+    (" light two", " light 2"),
+    (" led two", " led 2"),
+    (" light to", " light 2"),
+    (" led to", " led 2"),
+]
+
+# Checked in order; the first match wins
+ACTION_WORDS = ["off", "on", "red", "green", "blue", "white", "purple", "yellow"]
+
+
+def normalize_text(text: str) -> str:
+    """Lower-case text and fix the "one"/"two"/"to" ambiguity"""
+    text_normalized = text.lower()
+    for old, new in NORMALIZE_REPLACEMENTS:
+        text_normalized = text_normalized.replace(old, new)
+    return text_normalized
+
+
+def parse_voice_command(text: str) -> Optional[Dict]:
+    """
+    Turns a recognized transcript into a board command.
+    Returns None if no color/action was found in the text.
+    """
+    words = normalize_text(text).split()
+
+    color_command_part = None
+    led_id = "ALL"
+    led_command_part = "ALL_"
+
+    # --- Detect LED ID by looking for "one", "two", "to", "1", "2" in the words ---
+    if "one" in words or "1" in words:
+        led_id = "LED1"
+        led_command_part = "LED1_"
+    elif "two" in words or "to" in words or "2" in words:
+        led_id = "LED2"
+        led_command_part = "LED2_"
+    elif "all" in words or "both" in words:
+        led_id = "ALL"
+        led_command_part = "ALL_"
+
+    # --- Find color/action from normalized text and words ---
+    for action in ACTION_WORDS:
+        if action in words:
+            color_command_part = action.upper()
+            break
+
+    if not color_command_part:
+        return None
+
+    # Determine the actual command to send to ESP32 and logical state for DB/Energy Sim
+    color_for_led1_logic = None
+    color_for_led2_logic = None
+    color_for_esp = color_command_part
+
+    if led_id == "LED1":
+        # LED1 supports full RGB colors
+        color_for_led1_logic = color_command_part
+        color_for_esp = color_command_part
+    elif led_id == "LED2":
+        # LED2 only supports ON/OFF
+        if color_command_part == "OFF":
+            color_for_esp = "OFF"
+            color_for_led2_logic = "OFF"
+        else:
+            color_for_esp = "ON"
+            color_for_led2_logic = "ON"
+    elif led_id == "ALL":
+        # For ALL: LED1 gets the color, LED2 gets ON/OFF
+        if color_command_part == "OFF":
+            color_for_led1_logic = "OFF"
+            color_for_led2_logic = "OFF"
+            color_for_esp = "OFF"
+        elif color_command_part == "ON":
+            color_for_led1_logic = "WHITE"
+            color_for_led2_logic = "ON"
+            color_for_esp = "WHITE"
+        else:
+            color_for_led1_logic = color_command_part
+            color_for_led2_logic = "ON"
+            color_for_esp = color_command_part
+
+    return {
+        "led_id": led_id,
+        "command_str": f"{led_command_part}{color_for_esp}",
+        "color_led1": color_for_led1_logic,
+        "color_led2": color_for_led2_logic,
+    }
+
+
+LED_TARGET_WORDS = {
+    "LED1": {"one", "1"},
+    "LED2": {"two", "to", "2"},
+    "ALL": {"all", "both"},
+}
+
+
+def parse_partial_command(text: str) -> Optional[Dict]:
+    """
+    Like parse_voice_command, but for a partial hypothesis of an utterance
+    that is still being spoken. Only returns a command once exactly one LED
+    target and exactly one action word have been heard.
+
+    This is a heuristic: the rest of the utterance is not recognized, and a
+    later word that parse_voice_command gives priority to would have changed
+    the result ("off" over "on" over colors, "one" over "two" over "all"),
+    e.g. "turn light one red off" dispatches LED1_RED here but parses to
+    LED1_OFF in full. It relies on commands naming the action last.
+    """
+    words = set(normalize_text(text).split())
+
+    targets = [led_id for led_id, target_words in LED_TARGET_WORDS.items() if words & target_words]
+    actions = [action for action in ACTION_WORDS if action in words]
+    if len(targets) != 1 or len(actions) != 1:
+        return None
+
+    return parse_voice_command(text)